@@ -11,8 +11,11 @@
     the CXF file data to another program through STDOUT
 
     ttf2cxf_stream
-    Version 0.4
+    Version 0.5
 	
+    V0.5
+	- Added '-c' command line option to only convert the listed character codes
+
     V0.4
 	- Changed fixed number of segments per arc to fixed arc angle limit
     - Removed '-n' command line option to set the number of points in an arc approximation
@@ -47,6 +50,9 @@
 */
 
 #include <iostream>
+#include <set>
+#include <stdlib.h>
+#include <string.h>
 #include <math.h>
 #include <ft2build.h>
 #include FT_FREETYPE_H
@@ -67,6 +73,7 @@ double letterSpacing;
 double wordSpacing;
 double lineSpacingFactor;
 int extended_chars;
+std::set<FT_ULong> char_codes;
 std::string author;
 
 int STDOUT = 0; 
@@ -272,6 +279,7 @@ int main(int argc, char* argv[]) {
         std::cout << "  -w word spacing                Word spacing (float)\n";
         std::cout << "  -f line spacing factor         Default is 1.0 (float)\n";
         std::cout << "  -e enable extended characters\n";
+        std::cout << "  -c codes                       Only convert these character codes (comma separated decimal)\n";
         exit(1);
     }
 
@@ -300,6 +308,15 @@ int main(int argc, char* argv[]) {
 		else if (!strcmp(argv[i], "-e")) {
                         extended_chars = 1;
 		}
+		else if (!strcmp(argv[i], "-c") && i+1 < argc) {
+			++i;
+			char* next = argv[i];
+			while (*next != 0) {
+				char_codes.insert(strtoul(next, &next, 10));
+				if (*next == ',') ++next;
+				else break;
+			}
+		}
 
 	}
 
@@ -385,7 +402,9 @@ int main(int argc, char* argv[]) {
     int skip_cnt=0;
     while (gindex != 0) {
       // Skipping codes greater than 255 unless specifically requested by "-e" command line option
-      if (charcode > 255  && extended_chars == 0)
+      // and codes that are not listed with the "-c" command line option (if it is used)
+      if ((charcode > 255  && extended_chars == 0) ||
+          (!char_codes.empty() && char_codes.count(charcode) == 0))
 	{
 	  skip_cnt = skip_cnt+1;
 	}
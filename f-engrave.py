@@ -330,6 +330,20 @@ if PIL == True:
         PIL = False
         sys.stdout.write("PIL not loaded.\n")
 
+NUMPY = True
+try:
+    import numpy
+except:
+    NUMPY = False
+
+PARALLEL = True
+try:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import wait as futures_wait
+except:
+    PARALLEL = False
+
 
 from math import *
 from time import time
@@ -342,8 +356,12 @@ if sys.platform == 'win32':
     from subprocess import STARTUPINFO, STARTF_USESHOWWINDOW
     
 import webbrowser
+import io
 import struct
+import hashlib
 import pyclipper
+from array import array
+from bisect import bisect_left, bisect_right
 
 try:
     unichr
@@ -394,19 +412,26 @@ def potrace():
 ################################################################################
 #             Function for outputting messages to different locations          #
 #            depending on what options are enabled                             #
+#    While G-code is being written to stdout (STDOUT_GCODE) the messages go    #
+#    to stderr so they do not end up in the middle of the G-code.              #
 ################################################################################
+STDOUT_GCODE = False
 def fmessage(text,newline=True):
-    global IN_AXIS, QUIET
+    global IN_AXIS, QUIET, STDOUT_GCODE
     if (not IN_AXIS and not QUIET):
+        if STDOUT_GCODE:
+            out = sys.stderr
+        else:
+            out = sys.stdout
         if newline==True:
             try:
-                sys.stdout.write(text)
-                sys.stdout.write("\n")
+                out.write(text)
+                out.write("\n")
             except:
                 pass
         else:
             try:
-                sys.stdout.write(text)
+                out.write(text)
             except:
                 pass
 
@@ -475,16 +500,33 @@ def Get_Angle(s,c):
 # segments based on the angular length of the arc. Since the idea of           #
 # this font description is to make it support independent x and y scaling,     #
 # we do not use native arcs in the g-code.                                      #
+#                                                                              #
+# The file is read in one pass.  Each line is handled based on its first       #
+# character and a Character is added to the font when the next character      #
+# starts (or at the end of the file).                                          #
+#                                                                              #
+# The stroke end points of all of the characters are kept in one flat array.  #
+# Each Character only holds its place in the array (and its size) so the Line #
+# objects are made just for the characters that are engraved.                 #
+#                                                                              #
+# If a sections dictionary is passed in, the range of line numbers in the     #
+# file for each character (header to the next header) is saved in it so one  #
+# character can be read again later without reading the whole font (see      #
+# cxf_byte_sections).                                                         #
 ################################################################################
-def parse(file,segarc):
+def parse(file,segarc,sections=None):
     font = {}
     key = None
-    stroke_list = []
-    xmax, ymax = 0, 0
-        
-    for text_in in file:
+    strokes = array('d')
+    first = 0
+    key_re = re.compile(r'^\[(.*)\]\s')
+    # A character is only saved if a line was read after its header
+    char_found = False
+    head = 0
+    line_num = -1
+
+    for line_num, text_in in enumerate(file):
         #print(text_in)
-        text = text_in+" "
         # format for a typical letter (lower-case r):
         # #comment, with a blank line after it
         #
@@ -493,46 +535,16 @@ def parse(file,segarc):
         # L 0,6,2,6
         # A 2,5,1,0,90
         #
-        end_char = len(text)
-        if end_char and key: #save the character to our dictionary
-            font[key] = Character(key)
-            font[key].stroke_list = stroke_list
-            font[key].xmax = xmax
-        new_cmd = re.match(r'^\[(.*)\]\s', text)
-        if new_cmd: #new character
-            key_tmp = new_cmd.group(1)
-            if len(new_cmd.group(1)) == 1:
-                key = ord(key_tmp)
-            else:
-                if len(key_tmp) == 5:
-                    key_tmp = key_tmp[1:]
-                if len(key_tmp) == 4:
-                    try:
-                        key=int(key_tmp,16)
-                    except:
-                        key = None
-                        stroke_list = []
-                        xmax, ymax = 0, 0
-                        continue
-                else:
-                    key = None
-                    stroke_list = []
-                    xmax, ymax = 0, 0
-                    continue
-            stroke_list = []
-            xmax, ymax = 0, 0
-
-        line_cmd = re.match(r'^L (.*)', text)
-        if line_cmd:
-            coords = line_cmd.group(1)
-            coords = [float(n) for n in coords.split(',')]
-            stroke_list += [Line(coords)]
-            xmax = max(xmax, coords[0], coords[2])
-
-        arc_cmd = re.match(r'^A (.*)', text)
-        if arc_cmd:
-            coords = arc_cmd.group(1)
-            coords = [float(n) for n in coords.split(',')]
+        if key:
+            char_found = True
+        cmd = text_in[:2]
+
+        if cmd == "L ":
+            xstart,ystart,xend,yend = [float(n) for n in text_in[2:].split(',')]
+            strokes.extend((xstart,ystart,xend,yend))
+
+        elif cmd == "A ":
+            coords = [float(n) for n in text_in[2:].split(',')]
             xcenter, ycenter, radius, start_angle, end_angle = coords
 
             # since font defn has arcs as ccw, we need some font foo
@@ -549,66 +561,285 @@ def parse(file,segarc):
                 angle += angleincr
                 xend = cos( radians(angle) ) * radius + xcenter
                 yend = sin( radians(angle) ) * radius + ycenter
-                coords = [xstart,ystart,xend,yend]
-                stroke_list += [Line(coords)]
-                xmax = max(xmax, coords[0], coords[2])
-                ymax = max(ymax, coords[1], coords[3])
+                strokes.extend((xstart,ystart,xend,yend))
                 xstart = xend
                 ystart = yend
+
+        elif cmd[:1] == "[":
+            new_cmd = key_re.match(text_in+" ")
+            if not new_cmd:
+                continue
+            #save the last character to our dictionary
+            if char_found:
+                font[key] = Character(key,strokes,first,(len(strokes)-first)//4)
+                if sections != None:
+                    sections[key] = (head,line_num)
+            char_found = False
+            first = len(strokes)
+            head = line_num
+
+            key_tmp = new_cmd.group(1)
+            key = None
+            if len(key_tmp) == 1:
+                key = ord(key_tmp)
+            else:
+                if len(key_tmp) == 5:
+                    key_tmp = key_tmp[1:]
+                if len(key_tmp) == 4:
+                    try:
+                        key=int(key_tmp,16)
+                    except:
+                        pass
+
+    if char_found:
+        font[key] = Character(key,strokes,first,(len(strokes)-first)//4)
+        if sections != None:
+            sections[key] = (head,line_num+1)
     return font
 
+################################################################################
+# Change the line number ranges in sections (from parse) to byte offsets in   #
+# the CXF file so each character can be read with a seek.  The lines are     #
+# split the same way as a file opened in text mode ("\n", "\r\n" or "\r").    #
+# Returns None if the file can not be read.                                   #
+################################################################################
+def cxf_byte_sections(file_full,sections):
+    try:
+        fin = open(file_full,'rb')
+        data = fin.read()
+        fin.close()
+    except:
+        return None
+    offsets = [0] + [m.end() for m in re.finditer(b'\r\n|\r|\n',data)]
+    if offsets[-1] != len(data):
+        offsets.append(len(data))
+    byte_sections = {}
+    try:
+        for key in sections:
+            lo,hi = sections[key]
+            byte_sections[key] = (offsets[lo],offsets[hi])
+    except:
+        return None
+    return byte_sections
+
+################################################################################
+# Run ttf2cxf_stream and return the lines of the CXF font data.  If codes is  #
+# given only those character codes are converted (older versions of the      #
+# helper program ignore the "-c" option and convert all of the characters).  #
+################################################################################
+def ttf2cxf_read(file_full,segarc,ext_char,codes=None):
+    option = ""
+    if ext_char:
+        option = option + "-e"
+    else:
+        option = ""
+    cmd = [ttf2cxf_stream(),
+           option,
+           "-s",segarc]
+    if codes != None:
+        cmd = cmd + ["-c",",".join([str(code) for code in codes])]
+    cmd = cmd + [file_full,"STDOUT"]
+    startupinfo=None
+    if sys.platform == 'win32':
+        # This startupinfo structure prevents a console window from popping up on Windows
+        startupinfo = STARTUPINFO()
+        startupinfo.dwFlags |= STARTF_USESHOWWINDOW
+    p = Popen(cmd, stdout=PIPE, stderr=PIPE, startupinfo=startupinfo)
+    stdout, stderr = p.communicate()
+    if VERSION == 3:
+        return bytes.decode(stdout).split("\n")
+    else:
+        return stdout.split("\n")
+
+################################################################################
+# Where the strokes of the characters of a font read from the disk cache are  #
+# read from when they are used.  Only the bounds of the characters are kept   #
+# in the cache.  For a CXF file the characters are parsed again from their    #
+# own part of the file (sections holds the byte offsets of each character).   #
+# For a TTF file ttf2cxf_stream is run for just the character codes needed.   #
+# Characters that can not be read are left unread (strokes None) so they    #
+# are tried again the next time they are used.                                #
+################################################################################
+class Font_Source:
+    # More codes than this and the whole font is converted
+    MAX_CODES = 500
+
+    def __init__(self,file_full,segarc,ext_char):
+        self.file_full = file_full
+        self.segarc    = segarc
+        self.ext_char  = ext_char
+        self.sections  = None
+
+    def load(self,chars):
+        SegArc = float(self.segarc)
+        font = {}
+        try:
+            if self.sections != None:
+                fin = open(self.file_full,'rb')
+                for char in chars:
+                    if char.key in self.sections:
+                        lo,hi = self.sections[char.key]
+                        fin.seek(lo)
+                        data = fin.read(hi-lo)
+                        if VERSION < 3:
+                            lines = data.splitlines(True)
+                        else:
+                            lines = io.TextIOWrapper(io.BytesIO(data),errors="ignore")
+                        font.update( parse(lines,SegArc) )
+                fin.close()
+            else:
+                codes = [char.key for char in chars]
+                if len(codes) > self.MAX_CODES:
+                    codes = None
+                font = parse(ttf2cxf_read(self.file_full,self.segarc,self.ext_char,codes),SegArc)
+        except:
+            font = {}
+        ###########################################################
+        # The characters all came from this file when it was put #
+        # in the cache so a character that is missing now means  #
+        # the file (or the helper program) could not be read.    #
+        ###########################################################
+        missing = False
+        for char in chars:
+            if char.key in font:
+                char.strokes = font[char.key].strokes
+                char.first   = font[char.key].first
+                char.count   = font[char.key].count
+            else:
+                missing = True
+        if missing:
+            fmessage("Unable to read characters from font file: %s" %(self.file_full))
+
+################################################################################
+# Read the strokes of the characters in String that have not been read yet   #
+# (all of the characters from one source are read at once).                   #
+################################################################################
+def font_load(font,String):
+    sources = {}
+    for char in set(String):
+        try:
+            c = font[ord(char)]
+        except:
+            continue
+        if c.strokes == None:
+            sources.setdefault(c.source,[]).append(c)
+    for source in sources:
+        source.load(sources[source])
+
+################################################################################
+# Time reading each of the CXF font files in fontdir (--benchmark option)      #
+################################################################################
+def font_benchmark(fontdir,segarc=5.0):
+    try:
+        files = sorted(os.listdir(fontdir))
+    except:
+        fmessage("Font benchmark: unable to read font directory: %s" %(fontdir))
+        return
+    for name in files:
+        if os.path.splitext(name)[1].upper() != ".CXF":
+            continue
+        file_full = os.path.join(fontdir,name)
+        t0 = time()
+        if VERSION < 3:
+            fd = open(file_full)
+        else:
+            fd = open(file_full,errors="ignore")
+        font = parse(fd,segarc)
+        fd.close()
+        strokes = sum([font[key].count for key in font])
+        fmessage("Font %s: %d characters, %d strokes in %.3fs" %(name,len(font),strokes,time()-t0))
+
 ################################################################################
 def parse_dxf(dxf_file,segarc,new_origin=True):
     # Initialize / reset
     font = {}
     key = None
-    stroke_list = []
-    xmax, ymax = -1e10, -1e10
-    xmin, ymin =  1e10,  1e10
     dxf_import=DXF_CLASS()
     dxf_import.GET_DXF_DATA(dxf_file,tol_deg=segarc)
     dxfcoords=dxf_import.DXF_COORDS_GET(new_origin)
 
     ##save the character to our dictionary
     key = ord("F")
-    stroke_list=[]
+    strokes = array('d')
     for line in dxfcoords:
         XY=line
-        stroke_list += [ Line([ XY[0],XY[1],XY[2],XY[3] ]) ]
-        xmax=max(xmax,XY[0],XY[2])
-        ymax=max(ymax,XY[1],XY[3])
-        xmin=min(xmin,XY[0],XY[2])
-        ymin=min(ymin,XY[1],XY[3])
-
-    font[key] = Character(key)
-    font[key].stroke_list = stroke_list
-    font[key].xmax = xmax
-    font[key].ymax = ymax
-    font[key].xmin = xmin
-    font[key].ymin = ymin
+        strokes.extend( (XY[0],XY[1],XY[2],XY[3]) )
+
+    font[key] = Character(key,strokes,0,len(strokes)//4)
 
     return font
+
+################################################################################
+# Font wide metrics from the bounds of the characters:  the width of the      #
+# widest character and the highest and lowest points of all characters.      #
+# Returns None for an empty font.                                             #
+################################################################################
+def font_bounds(font):
+    if len(font) == 0:
+        return None
+    bounds = [font[key].bounds for key in font]
+    return ( max([b[0] for b in bounds]),
+             max([b[1] for b in bounds]),
+             min([b[2] for b in bounds]) )
 ################################################################################
 
+##################################################
+# A Character uses "count" strokes from the flat #
+# array "strokes" starting at index "first".     #
+# The bounds (xmax,ymax,ymin) are found when the #
+# Character is made and the stroke_list is made  #
+# the first time it is used.                     #
+# A Character made with a source (and bounds)    #
+# has its strokes read from the source the first #
+# time they are used.                            #
+##################################################
 class Character:
-    def __init__(self, key):
-        self.key = key
-        self.stroke_list = []
+    __slots__ = ("key","strokes","first","count","bounds","source","stroke_list")
+
+    def __init__(self, key, strokes=None, first=0, count=0, bounds=None, source=None):
+        self.key     = key
+        self.source  = source
+        if source != None:
+            self.strokes = None
+            self.first   = 0
+            self.count   = 0
+            self.bounds  = bounds
+            return
+        if strokes == None:
+            strokes = array('d')
+        self.strokes = strokes
+        self.first   = first
+        self.count   = count
+        last = first + 4*count
+        if count > 0:
+            self.bounds = ( max(strokes[first  :last:2]),
+                            max(strokes[first+1:last:2]),
+                            min(strokes[first+1:last:2]) )
+        else:
+            self.bounds = (0,0,0)
 
     def __repr__(self):
         return "%%s" % (self.stroke_list)
 
+    def __getattr__(self, name):
+        if name == "stroke_list":
+            if self.strokes == None:
+                self.source.load([self])
+                if self.strokes == None:
+                    return []
+            s = self.strokes
+            self.stroke_list = [Line(s[i:i+4]) for i in range(self.first,self.first+4*self.count,4)]
+            return self.stroke_list
+        raise AttributeError(name)
+
     def get_xmax(self):
-        try: return max([s.xmax for s in self.stroke_list[:]])
-        except ValueError: return 0
+        return self.bounds[0]
 
     def get_ymax(self):
-        try: return max([s.ymax for s in self.stroke_list[:]])
-        except ValueError: return 0
+        return self.bounds[1]
 
     def get_ymin(self):
-        try: return min([s.ymin for s in self.stroke_list[:]])
-        except ValueError: return 0
+        return self.bounds[2]
 
 ################################################################################
 class Line:
@@ -1922,6 +2153,7 @@ class Application(Frame):
         self.menu_Mode_Change()
 
     def createWidgets(self):
+        global STDOUT_GCODE
         self.master.bind("<Configure>", self.Master_Configure)
         self.master.bind('<Escape>', self.KEY_ESC)
         self.master.bind('<F1>', self.KEY_F1)
@@ -1949,6 +2181,10 @@ class Application(Frame):
         self.fontdex    = BooleanVar()
         self.v_flop     = BooleanVar()
         self.v_pplot    = BooleanVar()
+        self.v_parallel = BooleanVar()
+        self.v_disk_cache = BooleanVar()
+        self.font_disk_cache = BooleanVar()
+        self.path_opt   = BooleanVar()
         self.inlay      = BooleanVar()
         self.no_comments= BooleanVar()
         self.ext_char   = BooleanVar()
@@ -2004,8 +2240,11 @@ class Application(Frame):
         self.v_drv_crner= StringVar()
         self.v_stp_crner= StringVar()
         self.v_step_len = StringVar()
+        self.v_step_tol = StringVar()
         self.allowance  = StringVar()
         self.v_check_all= StringVar()
+        self.v_cache_size = StringVar()
+        self.font_cache_size = StringVar()
         self.v_max_cut  = StringVar()
         self.v_rough_stk= StringVar()
 
@@ -2047,6 +2286,10 @@ class Application(Frame):
 
         self.v_flop.set(0)
         self.v_pplot.set(0)
+        self.v_parallel.set(0)
+        self.v_disk_cache.set(0)
+        self.font_disk_cache.set(1)
+        self.path_opt.set(0)
         self.inlay.set(0)
         self.no_comments.set(1)
         self.ext_char.set(0)
@@ -2096,8 +2339,11 @@ class Application(Frame):
         self.v_drv_crner.set("135")
         self.v_stp_crner.set("200")
         self.v_step_len.set("0.01")
+        self.v_step_tol.set("0.0")       # Adaptive step tolerance, heuristic (0 = fixed step length)
         self.allowance.set("0.0")
         self.v_check_all.set("all")      # Options are "chr" and "all"
+        self.v_cache_size.set("100")     # Size limit of the v-carve disk cache (MB)
+        self.font_cache_size.set("20")   # Size limit of the font disk cache (MB)
         self.v_rough_stk.set("0.0")
         self.v_max_cut.set("-1.0")
 
@@ -2117,6 +2363,7 @@ class Application(Frame):
         self.svgcode = []
         self.coords  = []
         self.vcoords = []
+        self.vcarve_cache = {}
         self.clean_coords_sort=[]
         self.v_clean_coords_sort=[]
 
@@ -2126,6 +2373,8 @@ class Application(Frame):
         self.clean_name.set("_clean")
 
         self.font    = {}
+        self.font_bounds      = None
+        self.font_bounds_font = None
         self.RADIUS_PLOT = 0
         self.MAXX    = 0
         self.MINX    = 0
@@ -2194,10 +2443,11 @@ class Application(Frame):
 
         opts, args = None, None
         try:
-            opts, args = getopt.getopt(sys.argv[1:], "hbg:f:d:t:",["help","batch","gcode_file","fontdir=","defdir=","text="])
+            opts, args = getopt.getopt(sys.argv[1:], "hbg:f:d:t:",["help","batch","gcode_file","fontdir=","defdir=","text=","benchmark"])
         except:
             fmessage('Unable interpret command line options')
             sys.exit()
+        benchmark = False
         for option, value in opts:
             if option in ('-h','--help'):
                 fmessage(' ')
@@ -2207,8 +2457,12 @@ class Application(Frame):
                 fmessage('-d    : default directory (also --defdir)')
                 fmessage('-t    : engrave text (also --text)')
                 fmessage('-b    : batch mode (also --batch)')
-                fmessage('-h    : print this help (also --help)\n')
+                fmessage('-h    : print this help (also --help)')
+                fmessage('--benchmark : time the G-code formatting and reading the CXF fonts')
+                fmessage('              in the font directory and exit\n')
                 sys.exit()
+            if option in ('--benchmark',):
+                benchmark = True
             if option in ('-g','--gcode_file'):
                 self.Open_G_Code_File(value)
                 self.NGC_FILE = value
@@ -2243,6 +2497,11 @@ class Application(Frame):
             if option in ('-b','--batch'):
                 self.batch.set(1)
 
+        if benchmark:
+            gcode_benchmark()
+            font_benchmark(self.fontdir.get(),float(self.segarc.get()))
+            sys.exit()
+
         if self.batch.get():
             fmessage('(F-Engrave Batch Mode)')
 
@@ -2251,16 +2510,12 @@ class Application(Frame):
             else:
                 self.Read_image_file()
 
-            self.DoIt()
-            if self.cut_type.get() == "v-carve":
-                self.V_Carve_It()
-            self.WriteGCode()
-
-            for line in self.gcode:
-                try:
-                    sys.stdout.write(line+'\n')
-                except:
-                    sys.stdout.write('(skipping line)\n')
+            settings = Calc_Settings(self)
+            self.DoIt(settings)
+            if settings.cut_type == "v-carve":
+                self.V_Carve_It(settings=settings)
+            STDOUT_GCODE = True
+            self.WriteGCode(settings=settings,fout=sys.stdout)
             sys.exit()
 
         ##########################################################################
@@ -2564,6 +2819,7 @@ class Application(Frame):
         self.Entry_InsideAngle = Entry()
         self.Entry_OutsideAngle = Entry()
         self.Entry_StepSize = Entry()
+        self.Entry_StepTol = Entry()
         self.Entry_Allowance = Entry()
         self.Entry_W_CLEAN = Entry()
         self.Entry_CLEAN_DIA = Entry()
@@ -2701,6 +2957,33 @@ class Application(Frame):
         return 1
 
 ################################################################################
+    ##########################################################
+    # Order the loops with the given start and end points.   #
+    # Each loop goes to the nearest start (or end if ends is #
+    # True) of the loops left.  If Optimize Path Order is    #
+    # set the order is improved with 2-opt moves (when the   #
+    # loops can be reversed) and the rapid travel before and #
+    # after is reported.  If max_time (seconds) is given the #
+    # loops left after that time keep their original order  #
+    # and opt_time limits the 2-opt passes.  With no limits  #
+    # the order does not depend on the computer's speed.     #
+    # Returns a list of [loop,flip] (see path_order).        #
+    ##########################################################
+    def Path_Order(self,Xbeg,Ybeg,Xend,Yend,ends=True,max_time=None,opt_time=None):
+        t0 = time()
+        order = path_order(Xbeg,Ybeg,Xend,Yend,ends,max_time)
+        if self.path_opt.get() and len(order) > 2:
+            t1 = time()
+            in_order = [[loop,False] for loop in range(len(order))]
+            travel_in  = path_order_travel(in_order,Xbeg,Ybeg,Xend,Yend)
+            travel_nn  = path_order_travel(order,Xbeg,Ybeg,Xend,Yend)
+            if ends:
+                order = path_order_2opt(order,Xbeg,Ybeg,Xend,Yend,max_time=opt_time)
+            travel_opt = path_order_travel(order,Xbeg,Ybeg,Xend,Yend)
+            fmessage("(Path order: %d loops, rapid travel %.2f %s, sorted %.2f (%.2fs), 2-opt %.2f (%.2fs) )" \
+                     %(len(order),travel_in,self.units.get(),travel_nn,t1-t0,travel_opt,time()-t1))
+        return order
+
     def Sort_Paths(self,ecoords,i_loop=2):
         ##########################
         ###   find loop ends   ###
@@ -2721,55 +3004,18 @@ class Application(Frame):
         #######################################################
         # Find new order based on distance to next beg or end #
         #######################################################
-        order_out = []
-        use_beg=0
-        if len(ecoords)>0:
-            order_out.append([Lbeg[0],Lend[0]])
-        inext = 0
-        total=len(Lbeg)
-        for i in range(total-1):
-            if use_beg==1:
-                ii=Lbeg.pop(inext)
-                Lend.pop(inext)
-            else:
-                ii=Lend.pop(inext)
-                Lbeg.pop(inext)
+        Xbeg = [ecoords[i][0] for i in Lbeg]
+        Ybeg = [ecoords[i][1] for i in Lbeg]
+        Xend = [ecoords[i][0] for i in Lend]
+        Yend = [ecoords[i][1] for i in Lend]
+        order = self.Path_Order(Xbeg,Ybeg,Xend,Yend)
 
-            Xcur = ecoords[ii][0]
-            Ycur = ecoords[ii][1]
-
-            dx = Xcur - ecoords[ Lbeg[0] ][0]
-            dy = Ycur - ecoords[ Lbeg[0] ][1]
-            min_dist = dx*dx + dy*dy
-
-            dxe = Xcur - ecoords[ Lend[0] ][0]
-            dye = Ycur - ecoords[ Lend[0] ][1]
-            min_diste = dxe*dxe + dye*dye
-
-            inext=0
-            inexte=0
-            for j in range(1,len(Lbeg)):
-                dx = Xcur - ecoords[ Lbeg[j] ][0]
-                dy = Ycur - ecoords[ Lbeg[j] ][1]
-                dist = dx*dx + dy*dy
-                if dist < min_dist:
-                    min_dist=dist
-                    inext=j
-                ###
-                dxe = Xcur - ecoords[ Lend[j] ][0]
-                dye = Ycur - ecoords[ Lend[j] ][1]
-                diste = dxe*dxe + dye*dye
-                if diste < min_diste:
-                    min_diste=diste
-                    inexte=j
-                ###
-            if min_diste < min_dist:
-                inext=inexte
-                order_out.append([Lend[inexte],Lbeg[inexte]])
-                use_beg=1
+        order_out = []
+        for loop,flip in order:
+            if flip:
+                order_out.append([Lend[loop],Lbeg[loop]])
             else:
-                order_out.append([Lbeg[inext],Lend[inext]])
-                use_beg=0
+                order_out.append([Lbeg[loop],Lend[loop]])
         ###########################################################
         return order_out
 
@@ -2816,9 +3062,16 @@ class Application(Frame):
 
 
     ################################################################################
-    def WriteGCode(self,config_file=False):
+    ################################################################################
+    # The G-code lines are kept in self.gcode or if fout is given they are written #
+    # to fout (a file, pipe or sys.stdout) as they are made.                       #
+    ################################################################################
+    def WriteGCode(self,config_file=False,settings=None,fout=None,skipped='(skipping line)'):
         global Zero
-        self.gcode = []
+        if fout == None:
+            self.gcode = []
+        else:
+            self.gcode = Gcode_Stream(fout,skipped)
         SafeZ  =   float(self.ZSAFE.get())
         Depth  =   float(self.ZCUT.get())
 
@@ -2854,6 +3107,10 @@ class Application(Frame):
             self.gcode.append('(fengrave_set upper       %s )' %( int(self.upper.get())         ))
             self.gcode.append('(fengrave_set v_flop      %s )' %( int(self.v_flop.get())        ))
             self.gcode.append('(fengrave_set v_pplot     %s )' %( int(self.v_pplot.get())       ))
+            self.gcode.append('(fengrave_set v_parallel  %s )' %( int(self.v_parallel.get())    ))
+            self.gcode.append('(fengrave_set v_disk_cache %s )' %( int(self.v_disk_cache.get())  ))
+            self.gcode.append('(fengrave_set font_disk_cache %s )' %( int(self.font_disk_cache.get()) ))
+            self.gcode.append('(fengrave_set path_opt    %s )' %( int(self.path_opt.get())      ))
             self.gcode.append('(fengrave_set inlay       %s )' %( int(self.inlay.get())       ))
             self.gcode.append('(fengrave_set bmp_long    %s )' %( int(self.bmp_longcurve.get()) ))
             self.gcode.append('(fengrave_set var_dis     %s )' %( int(self.var_dis.get())       ))
@@ -2899,6 +3156,7 @@ class Application(Frame):
             self.gcode.append('(fengrave_set v_drv_crner %s )' %( self.v_drv_crner.get() ))
             self.gcode.append('(fengrave_set v_stp_crner %s )' %( self.v_stp_crner.get() ))
             self.gcode.append('(fengrave_set v_step_len  %s )' %( self.v_step_len.get()  ))
+            self.gcode.append('(fengrave_set v_step_tol  %s )' %( self.v_step_tol.get()  ))
             self.gcode.append('(fengrave_set allowance   %s )' %( self.allowance.get()   ))
 
             self.gcode.append('(fengrave_set v_max_cut   %s )' %( self.v_max_cut.get()   ))
@@ -2907,6 +3165,8 @@ class Application(Frame):
             self.gcode.append('(fengrave_set v_depth_lim  %s )' %( self.v_depth_lim.get() ))
 
             self.gcode.append('(fengrave_set v_check_all %s )' %( self.v_check_all.get() ))
+            self.gcode.append('(fengrave_set v_cache_size %s )' %( self.v_cache_size.get() ))
+            self.gcode.append('(fengrave_set font_cache_size %s )' %( self.font_cache_size.get() ))
             self.gcode.append('(fengrave_set bmp_turnp   %s )' %( self.bmp_turnpol.get()      ))
             self.gcode.append('(fengrave_set bmp_turds   %s )' %( self.bmp_turdsize.get()     ))
             self.gcode.append('(fengrave_set bmp_alpha   %s )' %( self.bmp_alphamax.get()     ))
@@ -2948,7 +3208,10 @@ class Application(Frame):
 
         if (config_file == True):
             return
-        
+
+        if settings == None:
+            settings = Calc_Settings(self)
+
         if self.units.get() == "in":
             dp=4
             dpfeed=2
@@ -3013,15 +3276,15 @@ class Application(Frame):
         roughing    = True
         rough_again = False
 
-        if self.cut_type.get() == "engrave" or self.bit_shape.get() == "FLAT":
+        if settings.cut_type == "engrave" or settings.bit_shape == "FLAT":
             ecoords = []
-            if (self.bit_shape.get() == "FLAT") and (self.cut_type.get() != "engrave"):
-                Acc = float(self.v_step_len.get())*1.5 #fudge factor
+            if (settings.bit_shape == "FLAT") and (settings.cut_type != "engrave"):
+                Acc = settings.v_step_len*1.5 #fudge factor
                 ###################################
                 ###   Create Flat Cut ECOORDS   ###
                 ###################################
                 if len(self.vcoords)>0:
-                    rbit      = self.calc_vbit_dia()/2.0
+                    rbit      = settings.vbit_dia/2.0
                     loopa_old = self.vcoords[0][3]
                     loop=0
                     for i in range(1,len(self.vcoords)):
@@ -3086,7 +3349,7 @@ class Application(Frame):
                     rough_again = True
                 zmax = zmin - maxDZ
 
-                if (self.bit_shape.get() == "FLAT") and (self.cut_type.get() != "engrave"):
+                if (settings.bit_shape == "FLAT") and (settings.cut_type != "engrave"):
                     FORMAT = '%%.%df' %(dp)
                     depth_val = FORMAT %(z1)
                 
@@ -3181,29 +3444,12 @@ class Application(Frame):
                 #####################################################
                 # Find new order based on distance to next begining #
                 #####################################################
-                order_out = []
-                order_out.append([Lbeg[0],Lend[0]])
-                inext = 0
-                total=len(Lbeg)
-                for i in range(total-1):
-                    ii=Lend.pop(inext)
-                    Lbeg.pop(inext)
-                    Xcur = self.vcoords[ii][0]
-                    Ycur = self.vcoords[ii][1]
-
-                    dx = Xcur - self.vcoords[ Lbeg[0] ][0]
-                    dy = Ycur - self.vcoords[ Lbeg[0] ][1]
-                    min_dist = dx*dx + dy*dy
-
-                    inext=0
-                    for j in range(1,len(Lbeg)):
-                        dx = Xcur - self.vcoords[ Lbeg[j] ][0]
-                        dy = Ycur - self.vcoords[ Lbeg[j] ][1]
-                        dist = dx*dx + dy*dy
-                        if dist < min_dist:
-                            min_dist=dist
-                            inext=j
-                    order_out.append([Lbeg[inext],Lend[inext]])
+                Xbeg = [self.vcoords[i][0] for i in Lbeg]
+                Ybeg = [self.vcoords[i][1] for i in Lbeg]
+                Xend = [self.vcoords[i][0] for i in Lend]
+                Yend = [self.vcoords[i][1] for i in Lend]
+                order = self.Path_Order(Xbeg,Ybeg,Xend,Yend,ends=False)
+                order_out = [[Lbeg[loop],Lend[loop]] for loop,flip in order]
                 #####################################################
                 new_coords=[]
                 for line in order_out:
@@ -3214,6 +3460,35 @@ class Application(Frame):
                 half_angle = radians( float(self.v_bit_angle.get())/2.0 )
                 bit_radius = float(self.v_bit_dia.get())/2.0
 
+                #########################################################
+                # Find the depth of each point once (the extra point at #
+                # the end is for the radius 0 used after the last one)  #
+                # and the deepest point of each loop (including the     #
+                # point after it) so that roughing passes can skip the  #
+                # loops that do not reach the depth of the pass.        #
+                #########################################################
+                v_depth = []
+                for r1 in [pt[2] for pt in new_coords]+[0]:
+                    if   settings.bit_shape == "VBIT":
+                        z1    = -r1   /tan(half_angle)
+                        if settings.inlay:
+                            z1    = z1 + settings.r_inlay_depth
+                    elif settings.bit_shape == "BALL":
+                        theta =  acos(r1 / bit_radius)
+                        z1    = -bit_radius*(1- sin(theta))
+                    else:
+                        # This case should have been caught in the
+                        # engraving section above
+                        z1    = 0.0
+                    v_depth.append(z1)
+
+                loop_spans = []
+                v_index = 0
+                for line in order_out:
+                    v_end = v_index + line[1] - line[0]
+                    loop_spans.append([v_index, v_end, min(v_depth[v_index:v_end+2])])
+                    v_index = v_end+1
+
                 ################################
                 # V-carve stuff
                 #maxDZ       =  float(self.v_max_cut.get())
@@ -3241,83 +3516,54 @@ class Application(Frame):
                     FLAG_line = 0
                     code=" "
 
-                    v_index=-1
-
-                    while v_index < len(new_coords)-1:
-                        v_index = v_index + 1
-                        x1   = new_coords[v_index][0]
-                        y1   = new_coords[v_index][1]
-                        r1   = new_coords[v_index][2]
-                        loop = new_coords[v_index][3]
-
-                        if ( v_index+1 < len(new_coords) ):
-                            nextx    = new_coords[v_index+1][0]
-                            nexty    = new_coords[v_index+1][1]
-                            nextr    = new_coords[v_index+1][2]
-                            nextloop = new_coords[v_index+1][3]
-                        else:
-                            nextx    =  0
-                            nexty    =  0
-                            nextr    =  0
-                            nextloop =  -99 #don't change this dummy number it is used below
-
-                        if   self.bit_shape.get() == "VBIT":
-                            z1    = -r1   /tan(half_angle)
-                            nextz = -nextr/tan(half_angle)
-                            if self.inlay.get():
-                                inlay_depth = self.calc_r_inlay_depth()
-                                z1    = z1 + inlay_depth
-                                nextz = nextz + inlay_depth
-
-                        elif self.bit_shape.get() == "BALL":
-                            theta =  acos(r1 / bit_radius)
-                            z1    = -bit_radius*(1- sin(theta))
-
-                            next_theta =  acos(nextr / bit_radius)
-                            nextz      = -bit_radius*(1- sin(next_theta))
-                        elif self.bit_shape.get() == "FLAT":
-                            # This case should have been caught in the
-                            # engraving section above
-                            pass
-                        else:
-                            pass
-
-                        if ( roughing ):
-                            z1    = z1    + rough_stock
-                            nextz = nextz + rough_stock
-                        if (   z1 < zmin):
-                            z1    = zmin
-                            rough_again = True
-                        if (nextz < zmin):
-                            nextz = zmin
-                            rough_again = True
-
-                        zmax = zmin - maxDZ #+ rough_stock
-                        if ((z1 > zmax) and (nextz > zmax)) and (roughing):
+                    zmax = zmin - maxDZ #+ rough_stock
+                    for v_beg,v_end,loop_zmin in loop_spans:
+                        if roughing and (loop_zmin + rough_stock > zmax):
+                            # the whole loop is above this pass
                             loop_old = -1
                             continue
-                        # check and see if we need to move to a new discontinuous start point
-                        if (loop != loop_old):
-                            g.flush()
-                            # lift engraver
-                            self.gcode.append("G0 Z%s" %(safe_val))
-                            # rapid to current position
-                            FORMAT = 'G0 X%%.%df Y%%.%df' %(dp,dp)
-                            self.gcode.append(FORMAT %(x1,y1))
-                            # drop cutter to z depth
-                            FORMAT = 'G1 Z%%.%df'  %(dp)
-                            self.gcode.append(FORMAT %(z1))
-                                
-                            lastx = x1
-                            lasty = y1
-                            lastz = z1
-                            g.cut(x1,y1,z1)
-                        else:
-                            g.cut(x1,y1,z1)
-                            lastx = x1
-                            lasty = y1
-                            lastz = z1
-                        loop_old = loop
+                        for v_index in range(v_beg,v_end+1):
+                            x1   = new_coords[v_index][0]
+                            y1   = new_coords[v_index][1]
+                            loop = new_coords[v_index][3]
+                            z1    = v_depth[v_index]
+                            nextz = v_depth[v_index+1]
+
+                            if ( roughing ):
+                                z1    = z1    + rough_stock
+                                nextz = nextz + rough_stock
+                            if (   z1 < zmin):
+                                z1    = zmin
+                                rough_again = True
+                            if (nextz < zmin):
+                                nextz = zmin
+                                rough_again = True
+
+                            if ((z1 > zmax) and (nextz > zmax)) and (roughing):
+                                loop_old = -1
+                                continue
+                            # check and see if we need to move to a new discontinuous start point
+                            if (loop != loop_old):
+                                g.flush()
+                                # lift engraver
+                                self.gcode.append("G0 Z%s" %(safe_val))
+                                # rapid to current position
+                                FORMAT = 'G0 X%%.%df Y%%.%df' %(dp,dp)
+                                self.gcode.append(FORMAT %(x1,y1))
+                                # drop cutter to z depth
+                                FORMAT = 'G1 Z%%.%df'  %(dp)
+                                self.gcode.append(FORMAT %(z1))
+                                    
+                                lastx = x1
+                                lasty = y1
+                                lastz = z1
+                                g.cut(x1,y1,z1)
+                            else:
+                                g.cut(x1,y1,z1)
+                                lastx = x1
+                                lasty = y1
+                                lastz = z1
+                            loop_old = loop
                     g.flush()
                 g.flush()
             g.flush()
@@ -3326,7 +3572,7 @@ class Application(Frame):
         XOrigin    =  float(self.xorigin.get())
         YOrigin    =  float(self.yorigin.get())
         Radius_plot=  float(self.RADIUS_PLOT)
-        if Radius_plot != 0 and self.cut_type.get() == "engrave":
+        if Radius_plot != 0 and settings.cut_type == "engrave":
             self.gcode.append('G0 Z%s' %(safe_val))
 
             FORMAT = 'G0 X%%.%df Y%%.%df' %(dp,dp)
@@ -3360,9 +3606,12 @@ class Application(Frame):
     #############################
     # Write Cleanup G-code File #
     #############################
-    def WRITE_CLEAN_UP(self,bit_type="straight"):
+    def WRITE_CLEAN_UP(self,bit_type="straight",fout=None):
         global Zero
-        self.gcode = []
+        if fout == None:
+            self.gcode = []
+        else:
+            self.gcode = Gcode_Stream(fout)
         SafeZ  =   float(self.ZSAFE.get())
         BitDia =   float(self.clean_dia.get())
 
@@ -3408,6 +3657,15 @@ class Application(Frame):
             dp=3
             dpfeed=1
         
+        # The clean up paths are simplified (and arcs fit) the same
+        # way as the engraving paths
+        g = Gcode(safetyheight = SafeZ,
+                 tolerance=Acc,
+                 target=lambda s: self.gcode.append(s),
+                 arc_fit = self.arc_fit.get())
+        g.dp     = dp
+        g.dpfeed = dpfeed
+        g.set_plane(17)
 
         if not self.var_dis.get():
             FORMAT = '#1 = %%.%df  ( Safe Z )' %(dp)
@@ -3485,30 +3743,14 @@ class Application(Frame):
 
             if len(coords_out) > 0:
                 loop_old = -1
-                FLAG_arc = 0
-                FLAG_line = 0
-                code=" "
-                v_index=-1
-                while v_index < len(coords_out)-1:
-                    v_index = v_index + 1
+                for v_index in range(len(coords_out)):
                     x1   = coords_out[v_index][0]
                     y1   = coords_out[v_index][1]
-                    r1   = coords_out[v_index][2]
                     loop = coords_out[v_index][3]
 
-                    if ( v_index+1 < len(coords_out) ):
-                        nextx    = coords_out[v_index+1][0]
-                        nexty    = coords_out[v_index+1][1]
-                        nextr    = coords_out[v_index+1][2]
-                        nextloop = coords_out[v_index+1][3]
-                    else:
-                        nextx    =  0
-                        nexty    =  0
-                        nextr    =  0
-                        nextloop =  -99
-
                     # check and see if we need to move to a new discontinuous start point
                     if (loop != loop_old):
+                        g.flush()
                         # lift engraver
                         self.gcode.append("G0 Z%s" %(safe_val))
                         # rapid to current position
@@ -3532,21 +3774,16 @@ class Application(Frame):
                             feed_current = plunge_str
                             
                         self.gcode.append("G1 Z%s" %(depth_val) + FEED_STRING)
+                        # The rapid and plunge are written here so
+                        # the position is set for the Gcode object
+                        g.lastx, g.lasty, g.lastz = x1, y1, z1
 
-                        lastx=x1
-                        lasty=y1
-                    else:
-                        if (feed_str == feed_current):
-                            FEED_STRING = ""
-                        else:
-                            FEED_STRING = " F" + feed_str
+                        if (feed_str != feed_current):
+                            g.set_feed(feed_str)
                             feed_current = feed_str
-                        
-                        FORMAT = 'G1 X%%.%df Y%%.%df' %(dp,dp)
-                        self.gcode.append(FORMAT %(x1,y1) + FEED_STRING)
-                        lastx=x1
-                        lasty=y1
+                    g.cut(x1,y1,z1)
                     loop_old = loop
+                g.flush()
 
         #End multipass loop
 
@@ -3822,12 +4059,7 @@ class Application(Frame):
     def WriteToAxis(self):
         if (self.Check_All_Variables() > 0):
             return
-        self.WriteGCode()
-        for line in self.gcode:
-            try:
-                sys.stdout.write(line+'\n')
-            except:
-                pass
+        self.WriteGCode(fout=sys.stdout,skipped=None)
         self.Quit_Click(None)
 
     def Quit_Click(self, event):
@@ -3928,8 +4160,9 @@ class Application(Frame):
         self.clean_coords_sort=[]
         self.v_clean_coords_sort=[]
         win_id=self.grab_current()
-        self.Clean_Calc_Click("straight")
-        self.Clean_Calc_Click("v-bit")
+        settings = Calc_Settings(self)
+        self.Clean_Calc_Click("straight",settings)
+        self.Clean_Calc_Click("v-bit",settings)
         self.Plot_Data()
 
         try:
@@ -4265,6 +4498,30 @@ class Application(Frame):
     def Entry_Accuracy_Callback(self, varName, index, mode):
         self.entry_set(self.Entry_Accuracy,self.Entry_Accuracy_Check())
     #############################
+    def Entry_v_cache_size_Check(self):
+        try:
+            value = float(self.v_cache_size.get())
+            if  value < 0.0:
+                self.statusMessage.set(" Cache size limit should be greater than or equal to 0.0 ")
+                return 2 # Value is invalid number
+        except:
+            return 3     # Value not a number
+        return 1         # Value is a valid number changes do not require recalc
+    def Entry_v_cache_size_Callback(self, varName, index, mode):
+        self.entry_set(self.Entry_v_cache_size,self.Entry_v_cache_size_Check())
+    #############################
+    def Entry_font_cache_size_Check(self):
+        try:
+            value = float(self.font_cache_size.get())
+            if  value < 0.0:
+                self.statusMessage.set(" Cache size limit should be greater than or equal to 0.0 ")
+                return 2 # Value is invalid number
+        except:
+            return 3     # Value not a number
+        return 1         # Value is a valid number changes do not require recalc
+    def Entry_font_cache_size_Callback(self, varName, index, mode):
+        self.entry_set(self.Entry_font_cache_size,self.Entry_font_cache_size_Check())
+    #############################
     def Entry_BoxGap_Check(self):
         try:
             value = float(self.boxgap.get())
@@ -4385,6 +4642,18 @@ class Application(Frame):
     def Entry_StepSize_Callback(self, varName, index, mode):
         self.entry_set(self.Entry_StepSize, self.Entry_StepSize_Check() )
     #############################
+    def Entry_StepTol_Check(self):
+        try:
+            value = float(self.v_step_tol.get())
+            if  value < 0.0:
+                self.statusMessage.set(" Adaptive step tolerance should be greater than or equal to 0 ")
+                return 2 # Value is invalid number
+        except:
+            return 3     # Value not a number
+        return 0         # Value is a valid number
+    def Entry_StepTol_Callback(self, varName, index, mode):
+        self.entry_set(self.Entry_StepTol, self.Entry_StepTol_Check() )
+    #############################
     def Entry_Allowance_Check(self):
         try:
             value = float(self.allowance.get())
@@ -4600,6 +4869,7 @@ class Application(Frame):
         self.entry_set(self.Entry_InsideAngle, self.Entry_InsideAngle_Check() ,2) +\
         self.entry_set(self.Entry_OutsideAngle,self.Entry_OutsideAngle_Check(),2) +\
         self.entry_set(self.Entry_StepSize,    self.Entry_StepSize_Check()    ,2) +\
+        self.entry_set(self.Entry_StepTol,     self.Entry_StepTol_Check()     ,2) +\
         self.entry_set(self.Entry_CLEAN_DIA,   self.Entry_CLEAN_DIA_Check()   ,2) +\
         self.entry_set(self.Entry_STEP_OVER,   self.Entry_STEP_OVER_Check()   ,2) +\
         self.entry_set(self.Entry_Allowance,   self.Entry_Allowance_Check()   ,2) +\
@@ -4666,10 +4936,10 @@ class Application(Frame):
 
     ##########################################################################
     ##########################################################################
-    def Clean_Calc_Click(self,bit_type="straight"):
+    def Clean_Calc_Click(self,bit_type="straight",settings=None):
         if (self.Check_All_Variables() > 0):
             return 1
-        self.Clean_Path_Calc(bit_type)
+        self.Clean_Path_Calc(bit_type,settings)
         if self.clean_coords_sort == []:
             return 1
         else:
@@ -4701,6 +4971,7 @@ class Application(Frame):
             self.v_bit_dia.set(  '%.3g' %(float(self.v_bit_dia.get()  )*factor) )
             self.v_depth_lim.set('%.3g' %(float(self.v_depth_lim.get())*factor) )
             self.v_step_len.set( '%.3g' %(float(self.v_step_len.get() )*factor) )
+            self.v_step_tol.set( '%.3g' %(float(self.v_step_tol.get() )*factor) )
             self.allowance.set(  '%.3g' %(float(self.allowance.get()  )*factor) )
             self.v_max_cut.set(  '%.3g' %(float(self.v_max_cut.get()  )*factor) )
             self.v_rough_stk.set('%.3g' %(float(self.v_rough_stk.get())*factor) )
@@ -4716,8 +4987,7 @@ class Application(Frame):
         if self.input_type.get() != "text":
             self.Read_image_file()
         try:
-            ymx = max(self.font[key].get_ymax() for key in self.font)
-            ymn = min(self.font[key].get_ymin() for key in self.font)
+            xmx,ymx,ymn = self.Font_Bounds()
             image_height = ymx-ymn
         except:
             if self.units.get() == 'in':
@@ -4875,6 +5145,14 @@ class Application(Frame):
                    self.v_flop.set(line[line.find("v_flop"):].split()[1])
                 elif "v_pplot"      in input_code:
                    self.v_pplot.set(line[line.find("v_pplot"):].split()[1])
+                elif "v_parallel"   in input_code:
+                   self.v_parallel.set(line[line.find("v_parallel"):].split()[1])
+                elif "v_disk_cache" in input_code:
+                   self.v_disk_cache.set(line[line.find("v_disk_cache"):].split()[1])
+                elif "font_disk_cache" in input_code:
+                   self.font_disk_cache.set(line[line.find("font_disk_cache"):].split()[1])
+                elif "path_opt"     in input_code:
+                   self.path_opt.set(line[line.find("path_opt"):].split()[1])
                 elif "inlay"      in input_code:
                    self.inlay.set(line[line.find("inlay"):].split()[1])
                 elif "bmp_long"      in input_code:
@@ -4980,6 +5258,8 @@ class Application(Frame):
                     self.v_stp_crner.set(line[line.find("v_stp_crner"):].split()[1])
                 elif "v_step_len"    in input_code:
                     self.v_step_len.set(line[line.find("v_step_len"):].split()[1])
+                elif "v_step_tol"    in input_code:
+                    self.v_step_tol.set(line[line.find("v_step_tol"):].split()[1])
                 elif "allowance"    in input_code:
                     self.allowance.set(line[line.find("allowance"):].split()[1])
                 elif "v_max_cut"    in input_code:
@@ -4992,6 +5272,10 @@ class Application(Frame):
                     self.v_depth_lim.set(line[line.find("v_depth_lim"):].split()[1])
                 elif "v_check_all"    in input_code:
                     self.v_check_all.set(line[line.find("v_check_all"):].split()[1])
+                elif "v_cache_size" in input_code:
+                    self.v_cache_size.set(line[line.find("v_cache_size"):].split()[1])
+                elif "font_cache_size" in input_code:
+                    self.font_cache_size.set(line[line.find("font_cache_size"):].split()[1])
                 elif "bmp_turnp"    in input_code:
                     self.bmp_turnpol.set(line[line.find("bmp_turnp"):].split()[1])
                 elif "bmp_turds"    in input_code:
@@ -5118,6 +5402,35 @@ class Application(Frame):
             self.statusbar.configure( bg = 'white' )
 
 
+    ##########################################
+    # The G-code is written to a temporary   #
+    # file that replaces filename when it is #
+    # done so an error part way through does #
+    # not leave a partly written file.       #
+    ##########################################
+    def Write_GCode_File(self,filename,write):
+        ftmp = "%s.%d.tmp" %(filename,os.getpid())
+        try:
+            fout = open(ftmp,'w')
+        except:
+            self.statusMessage.set("Unable to open file for writing: %s" %(filename))
+            self.statusbar.configure( bg = 'red' )
+            return False
+        try:
+            write(fout)
+            fout.close()
+            if os.path.isfile(filename):
+                os.remove(filename)
+            os.rename(ftmp,filename)
+        except:
+            fout.close()
+            try:
+                os.remove(ftmp)
+            except:
+                pass
+            raise
+        return True
+
     def menu_File_Save_G_Code_File(self):
         if (self.Check_All_Variables() > 0):
             return
@@ -5130,7 +5443,6 @@ class Application(Frame):
             if not message_ask_ok_cancel("Continue", mess ):
                 return
 
-        self.WriteGCode()
         init_dir = os.path.dirname(self.NGC_FILE)
         if ( not os.path.isdir(init_dir) ):
             init_dir = self.HOME_DIR
@@ -5151,18 +5463,8 @@ class Application(Frame):
 
         if filename != '' and filename != ():
             self.NGC_FILE = filename
-            try:
-                fout = open(filename,'w')
-            except:
-                self.statusMessage.set("Unable to open file for writing: %s" %(filename))
-                self.statusbar.configure( bg = 'red' )
+            if not self.Write_GCode_File(filename,lambda fout: self.WriteGCode(fout=fout)):
                 return
-            for line in self.gcode:
-                try:
-                    fout.write(line+'\n')
-                except:
-                    fout.write('(skipping line)\n')
-            fout.close()
             self.statusMessage.set("File Saved: %s" %(filename))
             self.statusbar.configure( bg = 'white' )
 
@@ -5171,8 +5473,6 @@ class Application(Frame):
         if (self.Check_All_Variables() > 0):
             return
 
-        self.WRITE_CLEAN_UP(bit_type)
-
         init_dir = os.path.dirname(self.NGC_FILE)
         if ( not os.path.isdir(init_dir) ):
             init_dir = self.HOME_DIR
@@ -5200,18 +5500,8 @@ class Application(Frame):
                                      initialfile= init_file )
 
         if filename != '' and filename != ():
-            try:
-                fout = open(filename,'w')
-            except:
-                self.statusMessage.set("Unable to open file for writing: %s" %(filename))
-                self.statusbar.configure( bg = 'red' )
+            if not self.Write_GCode_File(filename,lambda fout: self.WRITE_CLEAN_UP(bit_type,fout=fout)):
                 return
-            for line in self.gcode:
-                try:
-                    fout.write(line+'\n')
-                except:
-                    fout.write('(skipping line)\n')
-            fout.close()
             self.statusMessage.set("File Saved: %s" %(filename))
             self.statusbar.configure( bg = 'white' )
 
@@ -5804,118 +6094,10 @@ class Application(Frame):
         else:
             self.segID.append( self.PreviewCanvas.create_oval(x1,y1,x2,y2, outline=color, fill=color, width=0 ))
 
-    ############################################################################
-    # Routine finds the maximum radius that can be placed in the position      #
-    # xpt,ypt witout interfearing with other line segments (rmin is max R LOL) #
-    ############################################################################
-    #def find_max_circle(self,xpt,ypt,rmin,char_num,seg_sin,seg_cos,corner,Acc_delete,CHK_STRING):
-    def find_max_circle(self,xpt,ypt,rmin,char_num,seg_sin,seg_cos,corner,CHK_STRING):
-        global Zero
-        rtmp = rmin
-
-        xIndex = int((xpt-self.MINX)/self.xPartitionLength)
-        yIndex = int((ypt-self.MINY)/self.yPartitionLength)
-
-        self.coords_check=[]
-        R_A = abs(rmin)
-        Bcnt=-1
-        ############################################################
-        # Loop over active partitions for the current line segment #
-        ############################################################
-        for line_B in self.partitionList[xIndex][yIndex]:
-            Bcnt=Bcnt+1
-            X_B = line_B[len(line_B)-3]
-            Y_B = line_B[len(line_B)-2]
-            R_B = line_B[len(line_B)-1]
-            GAP = sqrt( (X_B-xpt)*(X_B-xpt) + (Y_B-ypt)*(Y_B-ypt)  )
-            if GAP < abs(R_A + R_B):
-                self.coords_check.append(line_B)
-
-        for linec in self.coords_check:
-            XYc = linec
-            xmaxt=max(XYc[0],XYc[2]) + rmin*2
-            xmint=min(XYc[0],XYc[2]) - rmin*2
-            ymaxt=max(XYc[1],XYc[3]) + rmin*2
-            ymint=min(XYc[1],XYc[3]) - rmin*2
-            if (xpt >= xmint and  ypt >= ymint and xpt <= xmaxt and  ypt <= ymaxt):
-                logic_full = True
-            else:
-                logic_full = False
-                continue
-
-            if (CHK_STRING == "chr"):
-                logic_full = logic_full and (char_num == int(XYc[5]))
-
-            if corner==1:
-                logic_full = logic_full and                                                 \
-                             ( (fabs(xpt-XYc[0]) > Zero) or (fabs(ypt-XYc[1]) > Zero) ) and \
-                             ( (fabs(xpt-XYc[2]) > Zero) or (fabs(ypt-XYc[3]) > Zero) )
-
-            if logic_full:
-                xc1 = (XYc[0]-xpt) * seg_cos - (XYc[1]-ypt) * seg_sin
-                yc1 = (XYc[0]-xpt) * seg_sin + (XYc[1]-ypt) * seg_cos
-                xc2 = (XYc[2]-xpt) * seg_cos - (XYc[3]-ypt) * seg_sin
-                yc2 = (XYc[2]-xpt) * seg_sin + (XYc[3]-ypt) * seg_cos
-
-                if fabs(xc2-xc1) < Zero and fabs(yc2-yc1) > Zero:
-                    rtmp=fabs(xc1)
-                    if max(yc1,yc2) >= rtmp and min(yc1,yc2) <= rtmp:
-                        rmin = min(rmin,rtmp)
-
-                elif fabs(yc2-yc1) < Zero and fabs(xc2-xc1) > Zero:
-                    if max(xc1,xc2) >= 0.0 and min(xc1,xc2) <= 0.0 and yc1 > Zero:
-                        rtmp=yc1/2.0
-                        rmin = min(rmin,rtmp)
-
-                if fabs(yc2-yc1) > Zero and fabs(xc2-xc1) > Zero:
-                    m = (yc2-yc1)/(xc2-xc1)
-                    b = yc1 - m*xc1
-                    sq = m+1/m
-                    A = 1 + m*m - 2*m*sq
-                    B = -2*b*sq
-                    C = -b*b
-                    try:
-                        sq_root = sqrt(B*B-4*A*C)
-                        xq1 = (-B + sq_root)/(2*A)
-
-                        if xq1 >= min(xc1,xc2) and xq1 <= max(xc1,xc2):
-                            rtmp = xq1*sq + b
-                            if rtmp >= 0.0:
-                                rmin=min(rmin,rtmp)
-
-                        xq2 = (-B - sq_root)/(2*A)
-                        yq2 = m*xq2+b
-
-                        if xq2 >= min(xc1,xc2) and xq2 <= max(xc1,xc2):
-                            rtmp = xq2*sq + b
-                            if rtmp >= 0.0:
-                                rmin=min(rmin,rtmp)
-                    except:
-                        pass
-
-                if yc1 > Zero:
-                    rtmp = (xc1*xc1 + yc1*yc1) / (2*yc1)
-                    rmin=min(rmin,rtmp)
-
-                if yc2 > Zero:
-                    rtmp = (xc2*xc2 + yc2*yc2) / (2*yc2)
-                    rmin=min(rmin,rtmp)
-
-                ###### NEW V1.20 #######
-                if abs(yc1) < Zero and abs(xc1) < Zero:
-                    if yc2 > Zero:
-                        rmin = 0.0
-                if abs(yc2) < Zero and abs(xc2) < Zero:
-                    if yc1 > Zero:
-                        rmin = 0.0
-                ### END NEW V1.20 #####
-
-        return rmin
-
-    def Recalculate_RQD_Nocalc(self, event):
-        self.statusbar.configure( bg = 'yellow' )
-        self.Input.configure( bg = 'yellow' )
-        self.statusMessage.set(" Recalculation required.")
+    def Recalculate_RQD_Nocalc(self, event):
+        self.statusbar.configure( bg = 'yellow' )
+        self.Input.configure( bg = 'yellow' )
+        self.statusMessage.set(" Recalculation required.")
 
     def Recalculate_RQD_Click(self, event):
         self.statusbar.configure( bg = 'yellow' )
@@ -5927,6 +6109,17 @@ class Application(Frame):
         self.statusMessage.set(" Recalculation required.")
         self.DoIt()
 
+    ##########################################
+    # Font wide bounds (widest character,    #
+    # highest and lowest points), found once #
+    # for each font that is read             #
+    ##########################################
+    def Font_Bounds(self):
+        if self.font_bounds_font is not self.font:
+            self.font_bounds_font = self.font
+            self.font_bounds = font_bounds(self.font)
+        return self.font_bounds
+
     ##########################################
     #          Read Font File                #
     ##########################################
@@ -5948,7 +6141,33 @@ class Application(Frame):
 
         SegArc    =  float(self.segarc.get())
         TYPE=fileExtension.upper()
-        if TYPE=='.CXF':
+
+        ##########################################################
+        # Use the font from the disk cache if this file was read #
+        # before (same file, modification time and settings)     #
+        ##########################################################
+        fcache = None
+        if (TYPE=='.CXF' or TYPE=='.TTF') and self.font_disk_cache.get():
+            path = fengrave_cache_dir("fonts")
+            if path != None:
+                try:
+                    max_size = float(self.font_cache_size.get())*1e6
+                except:
+                    max_size = 0.0
+                fcache = Font_Disk_Cache(path,max_size)
+                fcache_key = fcache.key(file_full,(SegArc,bool(self.ext_char.get())))
+                if fcache_key == None:
+                    fcache = None
+                else:
+                    source = Font_Source(file_full,self.segarc.get(),self.ext_char.get())
+                    self.font = fcache.read(fcache_key,source)
+
+        if self.font != {}:
+            if TYPE=='.TTF':
+                self.input_type.set("text")
+            fcache = None
+        elif TYPE=='.CXF':
+            sections = {}
             try:
                 if VERSION <3:
                     file = open(file_full)
@@ -5958,32 +6177,16 @@ class Application(Frame):
                 self.statusMessage.set("Unable to Open CXF File: %s" %(file_full))
                 self.statusbar.configure( bg = 'red' )
                 return
-            self.font = parse(file,SegArc)  # build stroke lists from font file
+            self.font = parse(file,SegArc,sections)  # build stroke lists from font file
             file.close()
+            sections = cxf_byte_sections(file_full,sections)
+            if sections == None:
+                fcache = None
 
         elif TYPE=='.TTF':
-            option = ""
-            if self.ext_char.get():
-                option = option + "-e"
-            else:
-                option = ""
-            cmd = [ttf2cxf_stream(),
-                   option,
-                   "-s",self.segarc.get(),
-                   file_full,"STDOUT"]
+            sections = None
             try:
-                startupinfo=None
-                if sys.platform == 'win32':
-                    # This startupinfo structure prevents a console window from popping up on Windows
-                    startupinfo = STARTUPINFO()
-                    startupinfo.dwFlags |= STARTF_USESHOWWINDOW
-                p = Popen(cmd, stdout=PIPE, stderr=PIPE, startupinfo=startupinfo)
-                stdout, stderr = p.communicate()
-                if VERSION == 3:
-                    file=bytes.decode(stdout).split("\n")
-                else:
-                    file=stdout.split("\n")
-
+                file = ttf2cxf_read(file_full,self.segarc.get(),self.ext_char.get())
                 self.font = parse(file,SegArc)  # build stroke lists from font file
                 self.input_type.set("text")
             except:
@@ -5991,6 +6194,9 @@ class Application(Frame):
         else:
             pass
 
+        if fcache != None and self.font != {}:
+            fcache.write(fcache_key,self.font,sections)
+
         if (not self.batch.get()):
             self.entry_set(self.Entry_ArcAngle,self.Entry_ArcAngle_Check(),1)
             self.menu_View_Refresh()
@@ -6237,6 +6443,10 @@ class Application(Frame):
         if self.cut_type.get() == "v-carve":
             loop_old = -1
             r_inlay_top = self.calc_r_inlay_top()
+            bit_shape   = self.bit_shape.get()
+            inlay       = self.inlay.get()
+            if self.vcoords != []:
+                rbit    = self.calc_vbit_dia()/2.0
 
             if self.show_v_area.get():
                 for line in self.vcoords:
@@ -6246,12 +6456,11 @@ class Application(Frame):
                     r     = XY[2]
                     color = "black"
 
-                    rbit = self.calc_vbit_dia()/2.0
-                    if self.bit_shape.get() == "FLAT":
+                    if bit_shape == "FLAT":
                         if r >= rbit:
                             self.Plot_Circ(x1,y1,midx,midy,cszw,cszh,PlotScale,color,r,1)
                     else:
-                        if self.inlay.get():
+                        if inlay:
                             self.Plot_Circ(x1,y1,midx,midy,cszw,cszh,PlotScale,color,r-r_inlay_top,1)
                         else:
                             self.Plot_Circ(x1,y1,midx,midy,cszw,cszh,PlotScale,color,r,1)
@@ -6269,7 +6478,7 @@ class Application(Frame):
                     color = "white"
                     # check and see if we need to move to a new discontinuous start point
                     plot_flat = False
-                    if self.bit_shape.get() == "FLAT":
+                    if bit_shape == "FLAT":
                         if (r == rold) and (r >= rbit):
                             plot_flat = True
                     else:
@@ -6345,7 +6554,7 @@ class Application(Frame):
     ############################################################################
     #                         Perform  Calculations                            #
     ############################################################################
-    def DoIt(self):
+    def DoIt(self,settings=None):
         if ((self.delay_calc==1) or (self.delay_calc == 1)):
             return
         
@@ -6360,7 +6569,10 @@ class Application(Frame):
         if (self.Check_All_Variables() > 0):
             return
 
-        if (not self.batch.get()):
+        if settings == None:
+            settings = Calc_Settings(self)
+
+        if (not settings.batch):
             self.statusbar.configure( bg = 'yellow' )
             self.statusMessage.set(" Calculating.........")
             self.master.update_idletasks()
@@ -6378,16 +6590,16 @@ class Application(Frame):
         self.RADIUS_PLOT = 0
 
 
-        if len(self.font) == 0 and (not self.batch.get()):
+        if len(self.font) == 0 and (not settings.batch):
             self.statusbar.configure( bg = 'red' )
-            if self.input_type.get() == "text":
+            if settings.input_type == "text":
                 self.statusMessage.set("No Font Characters Loaded")
             else:
                 self.statusMessage.set("No Image Loaded")
             return
 
-        if self.input_type.get() == "text":
-            if (not self.batch.get()):
+        if settings.input_type == "text":
+            if (not settings.batch):
                 String    =  self.Input.get(1.0,END)
             else:
                 String    =  self.default_text
@@ -6412,7 +6624,7 @@ class Application(Frame):
             self.statusbar.configure( bg = 'red' )
             return
 
-        if self.cut_type.get() == "v-carve":
+        if settings.cut_type == "v-carve":
             Thick = 0.0
 
         line_maxx = []
@@ -6465,6 +6677,8 @@ class Application(Frame):
                     String = String + '\n'
                     mcnt = 0
 
+        font_load(self.font,String)
+
         ##################################
         ## Font Height/Width Calculation #
         ##################################
@@ -6476,15 +6690,17 @@ class Application(Frame):
             except:
                 pass
 
+        font_all = self.Font_Bounds()
         if self.H_CALC.get() == "max_all":
-            font_line_height = max(self.font[key].get_ymax() for key in self.font)
-            font_line_depth  = min(self.font[key].get_ymin() for key in self.font)
+            if font_all != None:
+                font_line_height = font_all[1]
+                font_line_depth  = font_all[2]
         elif self.H_CALC.get() == "max_use":
             font_line_height = font_used_height
             font_line_depth  = font_used_depth
             
         if font_line_height > -INF:
-            if (self.useIMGsize.get() and self.input_type.get()=="image"):
+            if (self.useIMGsize.get() and settings.input_type=="image"):
                 YScale = YScale_in/100.0
             else:
                 try:
@@ -6494,24 +6710,24 @@ class Application(Frame):
                 if YScale <= Zero:
                     YScale = .1
         else:
-            if (not self.batch.get()): self.statusbar.configure( bg = 'red' )
+            if (not settings.batch): self.statusbar.configure( bg = 'red' )
             if self.H_CALC.get() == "max_all":
-                if (not self.batch.get()):
+                if (not settings.batch):
                     self.statusMessage.set("No Font Characters Found")
                 else:
                     fmessage("(No Font Characters Found)")
             elif self.H_CALC.get() == "max_use":
-                if self.input_type.get()=="image":
+                if settings.input_type=="image":
                     error_text = "Image contains no design information. (Empty DXF File)"
                 else:
                     error_text = "Input Characters Were Not Found in the Current Font"
                     
-                if (not self.batch.get()):
+                if (not settings.batch):
                     self.statusMessage.set(error_text)
                 else:
                     fmessage("("+error_text+")")
             return
-        font_char_width  = max(self.font[key].get_xmax() for key in self.font)
+        font_char_width  = font_all[0]
         font_word_space =  font_char_width * (WSpaceP/100.0)
 
         XScale = float(self.XSCALE.get())  * YScale / 100
@@ -6519,12 +6735,12 @@ class Application(Frame):
 
         if Radius_in != 0.0:
             if self.outer.get() == True:
-                if self.upper.get() == True:
+                if settings.upper == True:
                     Radius =  Radius_in + Thick/2 + YScale*(-font_line_depth)
                 else:
                     Radius = -Radius_in - Thick/2 - YScale*(font_line_height)
             else:
-                if self.upper.get() == True:
+                if settings.upper == True:
                     Radius =  Radius_in - Thick/2 - YScale*(font_line_height)
                 else:
                     Radius = -Radius_in + Thick/2 + YScale*(-font_line_depth)
@@ -6614,12 +6830,12 @@ class Application(Frame):
         ##########################################
         #      TEXT LEFT JUSTIFY STUFF           #
         ##########################################
-        if self.justify.get() == "Left":
+        if settings.justify == "Left":
             pass
         ##########################################
         #          TEXT CENTERING STUFF          #
         ##########################################
-        if self.justify.get() == "Center":
+        if settings.justify == "Center":
             cnt=0
             for line in self.coords:
                 XY = line
@@ -6634,7 +6850,7 @@ class Application(Frame):
         ##########################################
         #        TEXT RIGHT JUSTIFY STUFF        #
         ##########################################
-        if self.justify.get() == "Right":
+        if settings.justify == "Right":
             for line in self.coords:
                 XY = line
                 line_num = int(XY[4])
@@ -6661,12 +6877,12 @@ class Application(Frame):
             ##########################################
             #         TEXT LEFT JUSTIFY STUFF        #
             ##########################################
-            if self.justify.get() == "Left":
+            if settings.justify == "Left":
                 pass
             ##########################################
             #          TEXT CENTERING STUFF          #
             ##########################################
-            if self.justify.get() == "Center":
+            if settings.justify == "Center":
                 for line in self.coords:
                     XY = line
                     XY[0],XY[1] = Transform(XY[0],XY[1],mida)
@@ -6674,10 +6890,10 @@ class Application(Frame):
             ##########################################
             #        TEXT RIGHT JUSTIFY STUFF        #
             ##########################################
-            if self.justify.get() == "Right":
+            if settings.justify == "Right":
                 for line in self.coords:
                     XY = line
-                    if self.upper.get() == True:
+                    if settings.upper == True:
                         XY[0],XY[1] = Transform(XY[0],XY[1],maxa)
                         XY[2],XY[3] = Transform(XY[2],XY[3],maxa)
                     else:
@@ -6763,7 +6979,7 @@ class Application(Frame):
         Thick_Border  =  float(self.STHICK.get() )
         Delta = Thick/2 + float(self.boxgap.get())
         if self.plotbox.get(): #and self.cut_type.get() != "v-carve":
-            if Radius_in == 0 or self.cut_type.get() == "v-carve":
+            if Radius_in == 0 or settings.cut_type == "v-carve":
             #    #Add coords for box
             #    self.coords.append([ minx-Delta, miny-Delta, maxx+Delta, miny-Delta, 0, 0])
             #    self.coords.append([ maxx+Delta, miny-Delta, maxx+Delta, maxy+Delta, 0, 0])
@@ -6783,7 +6999,7 @@ class Application(Frame):
                     self.coords.append([ minx-Delta, maxy+Delta, minx-Delta, miny-Delta, 0, 0])
 
                 
-                if self.cut_type.get() != "v-carve":
+                if settings.cut_type != "v-carve":
                     Delta = Delta + Thick/2
                 minx = minx - Delta
                 maxx = maxx + Delta
@@ -6876,7 +7092,7 @@ class Application(Frame):
         self.Xzero = x_zero
         self.Yzero = y_zero
 
-        if (not self.batch.get()):
+        if (not settings.batch):
             # Reset Status Bar and Entry Fields
             self.Input.configure(         bg = 'white' )
             self.entry_set(self.Entry_Yscale,  self.Entry_Yscale_Check()  ,1)
@@ -6904,7 +7120,7 @@ class Application(Frame):
             self.statusMessage.set(self.bounding_box.get())
 
         if no_font_record != []:
-            if (not self.batch.get()):
+            if (not settings.batch):
                 self.statusbar.configure( bg = 'orange' )
             fmessage('Characters not found in font file:',FALSE)
             fmessage("(",FALSE)
@@ -6912,27 +7128,12 @@ class Application(Frame):
                 fmessage( "%s," %(entry),FALSE)
             fmessage(")")
 
-        if (not self.batch.get()):
+        if (not settings.batch):
             self.Plot_Data()
         ################
         #   End DoIt   #
         ################
 
-    ##################################################
-    def record_v_carve_data(self,x1,y1,phi,rout,loop_cnt):
-        rbit = self.calc_vbit_dia() / 2.0
-        r_clean  = float(self.clean_dia.get())/2.0
-        
-        Lx, Ly = Transform(0,rout,-phi)
-        xnormv = x1+Lx
-        ynormv = y1+Ly
-        need_clean = 0
-        self.vcoords.append([xnormv, ynormv, rout, loop_cnt]) 
-        if abs(rbit-rout) <= Zero:
-            need_clean = 1
-        return xnormv,ynormv,rout
-
-
     #####################################################
     # determine if a point is inside a given polygon or not
     # Polygon is a list of (x,y) pairs.
@@ -6957,6 +7158,39 @@ class Application(Frame):
 
         return inside
 
+    ############################################################################
+    # Same test as point_inside_polygon for all of the points in xpts,ypts.    #
+    # The crossings are counted for all of the points and polygon edges at     #
+    # once using NumPy arrays.  Returns a list of 1 (inside) or -1 (outside).  #
+    ############################################################################
+    def points_inside_polygon(self,xpts,ypts,poly):
+        npts = len(xpts)
+        if not NUMPY or npts*len(poly) < 64:
+            return [self.point_inside_polygon(xpts[i],ypts[i],poly) for i in range(npts)]
+
+        P = numpy.array(poly,dtype=float)
+        p1x = P[:,0]
+        p1y = P[:,1]
+        p2x = numpy.roll(p1x,-1)
+        p2y = numpy.roll(p1y,-1)
+        emin = numpy.minimum(p1y,p2y)
+        emax = numpy.maximum(p1y,p2y)
+        xmax = numpy.maximum(p1x,p2x)
+        vert = p1x == p2x
+        dy = numpy.where(p2y == p1y, 1.0, p2y-p1y)
+        dx = p2x-p1x
+
+        inside = []
+        chunk = max(1,200000//len(poly))
+        for i in range(0,npts,chunk):
+            X = numpy.array(xpts[i:i+chunk],dtype=float)[:,None]
+            Y = numpy.array(ypts[i:i+chunk],dtype=float)[:,None]
+            xinters = (Y-p1y)*dx/dy+p1x
+            cross = (Y > emin) & (Y <= emax) & (X <= xmax) & (vert | (X <= xinters))
+            count = cross.sum(axis=1)
+            inside.extend(numpy.where(count%2 == 1,1,-1).tolist())
+        return inside
+
     def get_flop_status(self,CLEAN_FLAG=False):
         v_flop    =  bool(self.v_flop.get())
 
@@ -6970,7 +7204,216 @@ class Application(Frame):
         return v_flop
 
 
-    def V_Carve_It(self,DXF_FLAG = False):
+    ##########################################################
+    # Called after each line segment is v-carved to update   #
+    # the status bar, plot the new data and check for a stop #
+    ##########################################################
+    def V_Carve_Status(self,Lseg,vcoords,start,settings):
+        global STOP_CALC
+        self.v_length[0] = self.v_length[0] + Lseg
+        if (not settings.batch):
+            if self.v_pplot_on == 1:
+                cszw = int(self.PreviewCanvas.cget("width"))
+                cszh = int(self.PreviewCanvas.cget("height"))
+                midx = (self.MAXX+self.MINX)/2
+                midy = (self.MAXY+self.MINY)/2
+                self.master.update_idletasks()
+                for xv,yv,rv,loop_cnt in vcoords[start:]:
+                    self.Plot_Circ(xv,yv,midx,midy,cszw,cszh,self.pscale,"blue",rv,0)
+            self.V_Carve_Progress()
+
+        if STOP_CALC != 0:
+            STOP_CALC=0
+            self.vcoords = []
+            del vcoords[:]
+            self.v_stop_cnt = self.v_stop_cnt + 1
+
+    def V_Carve_Progress(self):
+        CUR_LENGTH,TOT_LENGTH,START_TIME,timestamp = self.v_length
+        stamp=int(3*time()) #update every 1/3 of a second
+        if (stamp != timestamp):
+            self.v_length[3]=stamp #interlock
+            self.v_pplot_on = self.v_pplot.get()
+
+            ####################################################
+            CUR_PCT=float(CUR_LENGTH)/TOT_LENGTH*100.0
+            if CUR_PCT > 0.0:
+                MIN_REMAIN =( time()-START_TIME )/60 * (100-CUR_PCT)/CUR_PCT
+                MIN_TOTAL = 100.0/CUR_PCT * ( time()-START_TIME )/60
+            else:
+                MIN_REMAIN = -1
+                MIN_TOTAL = -1
+
+            self.statusMessage.set('%.1f %% ( %.1f Minutes Remaining | %.1f Minutes Total )' %( CUR_PCT, MIN_REMAIN, MIN_TOTAL ) )
+            self.statusbar.configure( bg = 'yellow' )
+            self.PreviewCanvas.update()
+
+    #################################################################
+    # Run the v-carve calculation for the loops in a process pool.  #
+    # The items in loop_list are (loop_cnt,seg_list).  The loops   #
+    # are split into chunks (in order) and the results are put     #
+    # back together in the original loop order.  Returns None if   #
+    # the process pool could not be used.                          #
+    #################################################################
+    def V_Carve_Parallel(self,loop_list,loop_length,v_set,seg_steps,settings):
+        global STOP_CALC
+        try:
+            workers = multiprocessing.cpu_count()
+        except:
+            workers = 1
+        if workers < 2:
+            return None
+
+        nchunks = workers*4
+        Lchunk = sum(loop_length)/nchunks
+        chunks = []
+        chunk_length = []
+        for loop in range(len(loop_list)):
+            if chunks == [] or chunk_length[-1] >= Lchunk:
+                chunks.append([])
+                chunk_length.append(0.0)
+            chunks[-1].append( loop_list[loop] )
+            chunk_length[-1] = chunk_length[-1] + loop_length[loop]
+
+        try:
+            stop = multiprocessing.Event()
+            pool = ProcessPoolExecutor(max_workers=min(workers,len(chunks)),
+                                       initializer=v_carve_pool_init,
+                                       initargs=(self.vgrid,self.coords,v_set,seg_steps,stop))
+        except:
+            return None
+
+        vcoords = []
+        futures = []
+        try:
+            futures = [pool.submit(v_carve_pool_loops,chunk) for chunk in chunks]
+            pending = futures
+            while len(pending) > 0:
+                done, pending = futures_wait(pending,timeout=0.33)
+                if (not settings.batch):
+                    self.v_length[0] = 0.0
+                    for i in range(len(futures)):
+                        if futures[i].done():
+                            self.v_length[0] = self.v_length[0] + chunk_length[i]
+                    self.V_Carve_Progress()
+                if STOP_CALC != 0:
+                    v_carve_pool_stop(pool,futures,stop)
+                    return []
+            for future in futures:
+                vcoords.extend( future.result() )
+        except:
+            fmessage("Parallel V-Carve calculation failed. Using a single process.")
+            v_carve_pool_stop(pool,futures,stop)
+            return None
+        pool.shutdown()
+        return vcoords
+
+    #################################################################
+    # Find the concentric loop cuts for each of the islands (using  #
+    # a process pool if there is more than one island).  Returns a  #
+    # list of the rings for each island (in the order of islands).  #
+    #################################################################
+    def Clean_Loop_Rings(self,islands,DL):
+        workers = 1
+        if self.v_parallel.get() and PARALLEL and len(islands) > 1:
+            try:
+                workers = multiprocessing.cpu_count()
+            except:
+                workers = 1
+        if workers > 1:
+            try:
+                pool = ProcessPoolExecutor(max_workers=min(workers,len(islands)))
+                futures = [pool.submit(clean_loop_rings,island,DL) for island in islands]
+                island_rings = [future.result() for future in futures]
+                pool.shutdown()
+                return island_rings
+            except:
+                fmessage("Parallel clean up calculation failed. Using a single process.")
+                try:
+                    pool.shutdown(wait=False)
+                except:
+                    pass
+        return [clean_loop_rings(island,DL) for island in islands]
+
+    #################################################################
+    # Cache keys for the v-carve results of each loop.  The key    #
+    # depends on the geometry of the character the loop is part   #
+    # of, the characters within 2*rmax+dline of it (unless only   #
+    # the lines in the same character are checked) and the        #
+    # v-carve settings.  The geometry is taken relative to the    #
+    # start of the first line of the character and rotated so the #
+    # first line is along the x axis.  The results can be reused  #
+    # when the character is moved or rotated (repeated letters in #
+    # the text or text on a circle).  Returns a list of           #
+    # (key,x0,y0,cos_t,sin_t) for the loops in loop_list and the  #
+    # number of steps for each line.  The number of steps is      #
+    # found from the rounded line lengths in the key so every     #
+    # copy of a character gets the same steps (calculated or      #
+    # reused).                                                    #
+    #################################################################
+    def V_Carve_Cache_Keys(self,loop_list,v_set):
+        rmax,dline,dangle,v_drv_crner,v_stp_crner,BIT_ANGLE,not_b_carve,CHK_STRING,i_x1,i_y1,i_x2,i_y2,v_tol = v_set
+        settings = repr(v_set)
+        Dist = 2*rmax+dline
+
+        chars = {}
+        for line in range(len(self.coords)):
+            chars.setdefault(int(self.coords[line][5]),[]).append(line)
+        bounds = {}
+        for char_num in chars:
+            XY = [self.coords[line] for line in chars[char_num]]
+            bounds[char_num] = ( min(min(c[0],c[2]) for c in XY), max(max(c[0],c[2]) for c in XY),
+                                 min(min(c[1],c[3]) for c in XY), max(max(c[1],c[3]) for c in XY) )
+
+        char_keys = {}
+        seg_steps = [2]*len(self.coords)
+        for char_num in chars:
+            x0 = self.coords[chars[char_num][0]][0]
+            y0 = self.coords[chars[char_num][0]][1]
+            cos_t = 1.0
+            sin_t = 0.0
+            for line in chars[char_num]:
+                c = self.coords[line]
+                Lc = sqrt( (c[2]-c[0])*(c[2]-c[0]) + (c[3]-c[1])*(c[3]-c[1]) )
+                if Lc > Zero:
+                    cos_t = (c[2]-c[0])/Lc
+                    sin_t = (c[3]-c[1])/Lc
+                    break
+            xmin,xmax,ymin,ymax = bounds[char_num]
+            near = []
+            if CHK_STRING != "chr":
+                for char_B in chars:
+                    xminB,xmaxB,yminB,ymaxB = bounds[char_B]
+                    if char_B != char_num and xminB <= xmax+Dist and xmaxB >= xmin-Dist \
+                                          and yminB <= ymax+Dist and ymaxB >= ymin-Dist:
+                        near.extend(chars[char_B])
+            segs = []
+            for line in chars[char_num] + near:
+                c = self.coords[line]
+                xr1,yr1 = v_carve_cache_xy(c[0],c[1],x0,y0,cos_t,sin_t)
+                xr2,yr2 = v_carve_cache_xy(c[2],c[3],x0,y0,cos_t,sin_t)
+                segs.append( (round(xr1,9),round(yr1,9),round(xr2,9),round(yr2,9)) )
+            geo = array('d')
+            nchar = len(chars[char_num])
+            for k in range(nchar):
+                xr1,yr1,xr2,yr2 = segs[k]
+                Lseg = sqrt( (xr2-xr1)*(xr2-xr1) + (yr2-yr1)*(yr2-yr1) )
+                seg_steps[chars[char_num][k]] = int(max(floor(Lseg/dline),2))
+            for seg in segs[:nchar] + sorted(segs[nchar:]):
+                geo.extend(seg)
+            geo.append(nchar)
+            digest = hashlib.md5(settings.encode('utf-8'))
+            digest.update(geo.tostring() if VERSION < 3 else geo.tobytes())
+            char_keys[char_num] = [digest.hexdigest(),x0,y0,cos_t,sin_t,0]
+
+        loop_keys = []
+        for seg_list in loop_list:
+            char_key = char_keys[int(self.coords[seg_list[0]][5])]
+            loop_keys.append( ("%s-%d" %(char_key[0],char_key[5]),) + tuple(char_key[1:5]) )
+            char_key[5] = char_key[5] + 1
+        return loop_keys,seg_steps
+
+    def V_Carve_It(self,DXF_FLAG = False,settings=None):
         global STOP_CALC
         timestamp = 0
         self.master.unbind("<Configure>")
@@ -6986,11 +7429,14 @@ class Application(Frame):
         if (self.Check_All_Variables() > 0):
             return
 
-        self.DoIt()
+        if settings == None:
+            settings = Calc_Settings(self)
+
+        self.DoIt(settings)
         self.clean_coords_sort=[]
         self.v_clean_coords_sort=[]
 
-        if (not self.batch.get()):
+        if (not settings.batch):
             self.statusbar.configure( bg = 'yellow' )
             self.statusMessage.set('Preparing for V-Carve Calculations')
             self.master.update()
@@ -7001,10 +7447,10 @@ class Application(Frame):
         if self.cut_type.get() == "v-carve" and self.fontdex.get() == False:
 
             v_flop  = self.get_flop_status()
-            if (not self.batch.get()):
+            if (not settings.batch):
                 cszw = int(self.PreviewCanvas.cget("width"))
                 cszh = int(self.PreviewCanvas.cget("height"))
-                if (self.v_pplot.get() == 1):
+                if (settings.v_pplot == 1):
                     self.Plot_Data()
 
             PlotScale = self.pscale
@@ -7015,16 +7461,17 @@ class Application(Frame):
             midx=(maxx+minx)/2
             midy=(maxy+miny)/2
 
-            dline       = float(self.v_step_len.get())
+            dline       = settings.v_step_len
+            v_tol       = settings.v_step_tol
             ###############################################################
-            rbit      = self.calc_vbit_dia()/2.0
-            clean_dia = float(self.clean_dia.get())
+            rbit      = settings.vbit_dia/2.0
+            clean_dia = settings.clean_dia
             
-            r_inlay_top = self.calc_r_inlay_top()
+            r_inlay_top = settings.r_inlay_top
             rmax = rbit
             ###############################################################
             v_stp_crner = float(self.v_stp_crner.get())
-            if self.inlay.get():
+            if settings.inlay:
                 v_drv_crner = 360 - v_stp_crner
             else:
                 v_drv_crner = float(self.v_drv_crner.get())
@@ -7032,9 +7479,9 @@ class Application(Frame):
             Acc         = float(self.accuracy.get())
 
             CHK_STRING  = str(self.v_check_all.get())
-            not_b_carve = not bool(self.bit_shape.get() == "BALL")
+            not_b_carve = not bool(settings.bit_shape == "BALL")
 
-            if self.input_type.get() != "text":
+            if settings.input_type != "text":
                 CHK_STRING  = "all"
 
             BIT_ANGLE   = float(self.v_bit_angle.get())
@@ -7044,26 +7491,13 @@ class Application(Frame):
                 dangle = 2.0
 
             ##VVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVVV
-            if self.input_type.get() == "image":
+            if settings.input_type == "image":
                 self.coords = self.sort_for_v_carve(self.coords)
 
             if (DXF_FLAG == True):
                 return
             ##########################################################################
 
-            #set variable for first point in loop
-            xa = 9999
-            ya = 9999
-            xb = 9999
-            yb = 9999
-            #set variable for the point previously calculated in a loop
-            x0=9999
-            y0=9999
-            seg_sin0 = 2
-            seg_cos0 = 2
-            char_num0 = -1
-            theta = 9999.0
-            loop_cnt = 0
             if not v_flop:
                 v_inc = 1
                 v_index = -1
@@ -7079,364 +7513,152 @@ class Application(Frame):
                 i_x2 = 0
                 i_y2 = 1
 
-            coord_radius=[]
             #########################
             # Setup Grid Partitions #
             #########################
-            xLength = self.MAXX-self.MINX
-            yLength = self.MAXY-self.MINY
-
-            xN=0
-            yN=0
-
-            xN_minus_1 = max(int(xLength/((2*rmax+dline)*1.1)),1)
-            yN_minus_1 = max(int(yLength/((2*rmax+dline)*1.1)),1)
-
-            xPartitionLength=xLength/xN_minus_1
-            yPartitionLength=yLength/yN_minus_1
-
-            xN = xN_minus_1+1
-            yN = yN_minus_1+1
-
-            if (xPartitionLength<Zero):
-                xPartitionLength=1
-            if (yPartitionLength<Zero):
-                yPartitionLength=1
-            self.xPartitionLength = xPartitionLength
-            self.yPartitionLength = yPartitionLength
-
-            self.partitionList = []
-
-            for xCount in range(0,xN):
-                self.partitionList.append([])
-                for yCount in range(0,yN):
-                    self.partitionList[xCount].append([])
-
-            ###############################
-            # End Setup Grid Partitions   #
-            ###############################
-
-            CUR_CNT=-1
-            while (len(self.coords) > CUR_CNT+1):
-                CUR_CNT=CUR_CNT+1
-                XY_R = self.coords[CUR_CNT][:]
-                x1_R = XY_R[0]
-                y1_R = XY_R[1]
-                x2_R = XY_R[2]
-                y2_R = XY_R[3]
-                LENGTH = sqrt( (x2_R-x1_R)*(x2_R-x1_R) + (y2_R-y1_R)*(y2_R-y1_R) )
-                
-                R_R = LENGTH/2 + rmax
-                X_R = (x1_R + x2_R)/2
-                Y_R = (y1_R + y2_R)/2
-                coord_radius.append([X_R, Y_R, R_R])
-
-                #####################################################
-                # Determine active partitions for each line segment #
-                #####################################################
-                coded_index=[]
-                ## find the local coordinates of the line segment ends
-                x1_G = XY_R[0]-self.MINX
-                y1_G = XY_R[1]-self.MINY
-                x2_G = XY_R[2]-self.MINX
-                y2_G = XY_R[3]-self.MINY
-
-                ## Find the grid box index for each line segment end
-                X1i = int( x1_G / xPartitionLength )
-                X2i = int( x2_G / xPartitionLength )
-                Y1i = int( y1_G / yPartitionLength )
-                Y2i = int( y2_G / yPartitionLength )
-
-                ## Find the max/min grid box locations
-                Xindex_min = min(X1i,X2i)
-                Xindex_max = max(X1i,X2i)
-                Yindex_min = min(Y1i,Y2i)
-                Yindex_max = max(Y1i,Y2i)
-
-                check_points=[]
-                if (Xindex_max > Xindex_min) and (abs(x2_G-x1_G) > Zero):
-                    if (Yindex_max > Yindex_min) and (abs(y2_G-y1_G) > Zero):
-                        check_points.append([X1i,Y1i])
-                        check_points.append([X2i,Y2i])
-                        ## Establish line equation variables: y=m*x+b
-                        m_G = (y2_G-y1_G)/(x2_G-x1_G)
-                        b_G = y1_G - m_G*x1_G
-                        ## Add check point in each partition in the range of X values
-                        x_ind_check = Xindex_min+1
-                        while x_ind_check <= Xindex_max-1:
-                            x_val = x_ind_check * xPartitionLength
-                            y_val = m_G * x_val + b_G
-                            y_ind_check = int(y_val/yPartitionLength)
-                            check_points.append([x_ind_check,y_ind_check])
-                            x_ind_check = x_ind_check + 1
-                        ## Add check point in each partition in the range of Y values
-                        y_ind_check = Yindex_min+1
-                        while y_ind_check <= Yindex_max-1:
-                            y_val =  y_ind_check * yPartitionLength
-                            x_val = (y_val-b_G ) / m_G
-                            x_ind_check = int(x_val/xPartitionLength)
-                            check_points.append([x_ind_check,y_ind_check])
-                            y_ind_check = y_ind_check + 1
-                    else:
-                        x_ind_check = Xindex_min
-                        y_ind_check = Yindex_min
-                        while x_ind_check <= Xindex_max:
-                            check_points.append([x_ind_check,y_ind_check])
-                            x_ind_check = x_ind_check + 1
-                else:
-                    x_ind_check = Xindex_min
-                    y_ind_check = Yindex_min
-                    while y_ind_check <= Yindex_max:
-                        check_points.append([x_ind_check,y_ind_check])
-                        y_ind_check = y_ind_check + 1
+            self.vgrid = V_Carve_Grid(self.coords,self.MINX,self.MAXX,self.MINY,self.MAXY,rmax,dline)
 
-                ## For each grid box in check_points add the grid box and all adjacent grid boxes
-                ## to the list of boxes for this line segment
-                for xy_point in check_points:
-                    xy_p = xy_point
-                    xIndex = xy_p[0]
-                    yIndex = xy_p[1]
-                    for i in range( max(xIndex-1,0), min(xN,xIndex+2) ):
-                        for j in range( max(yIndex-1,0), min(yN,yIndex+2) ):
-                            coded_index.append(int(i+j*xN))
-
-                codedIndexSet= set(coded_index)
-                
-                for thisCode in codedIndexSet:
-                    thisIndex = thisCode
-                    line_R_appended = XY_R
-                    line_R_appended.append(X_R)
-                    line_R_appended.append(Y_R)
-                    line_R_appended.append(R_R)
-                    self.partitionList[int(thisIndex%xN)][int(thisIndex/xN)].append(line_R_appended)
             #########################################################
-            # End Determine active partitions for each line segment #
+            # Split the line segments into the loops to be v-carved #
+            # and determine the total length of segments for the    #
+            # percent complete calculation                          #
             #########################################################
-            ## Loop through again just to determine the total length of segments
-            ## For the percent complete calculation
             if (v_index >= len(self.coords)):
                 v_index = len(self.coords)
-            v_ind = v_index
 
-            CUR_CNT=-1
+            #set variable for the point previously calculated in a loop
+            x0=9999
+            y0=9999
+            char_num0 = -1
+            loop_list   = []
+            loop_length = []
             TOT_LENGTH = 0.0
-
             for line in range(len(self.coords)):
-                CUR_CNT=CUR_CNT+1
-                v_ind = v_ind + v_inc
-                x1 = self.coords[v_ind][i_x1]
-                y1 = self.coords[v_ind][i_y1]
-                x2 = self.coords[v_ind][i_x2]
-                y2 = self.coords[v_ind][i_y2]
-                LENGTH = sqrt( (x2-x1)*(x2-x1) + (y2-y1)*(y2-y1) )
-                TOT_LENGTH = TOT_LENGTH + LENGTH
-
-            CUR_LENGTH = 0.0
-            MAX_CNT = len(self.coords)
-            CUR_CNT = -1
-            START_TIME=time()
+                v_index = v_index + v_inc
+                x1 = self.coords[v_index][i_x1]
+                y1 = self.coords[v_index][i_y1]
+                x2 = self.coords[v_index][i_x2]
+                y2 = self.coords[v_index][i_y2]
+                char_num = int(self.coords[v_index][5])
+                dx = x2-x1
+                dy = y2-y1
+                Lseg = sqrt(dx*dx + dy*dy)
+                TOT_LENGTH = TOT_LENGTH + Lseg
+
+                if Lseg < Zero: #was Acc
+                    continue
+
+                if (fabs(x1-x0) > Zero) or (fabs(y1-y0) > Zero) or (char_num != char_num0):
+                    loop_list.append([])
+                    loop_length.append(0.0)
+                loop_list[-1].append(v_index)
+                loop_length[-1] = loop_length[-1] + Lseg
+                x0=x2
+                y0=y2
+                char_num0=char_num
+
+            v_set = (rmax,dline,dangle,v_drv_crner,v_stp_crner,BIT_ANGLE,not_b_carve,CHK_STRING,i_x1,i_y1,i_x2,i_y2,v_tol)
+
+            ##########################################################
+            # Only the loops that are not in the cache (from the     #
+            # last v-carve calculation or from an earlier loop with  #
+            # the same key) need to be calculated                    #
+            ##########################################################
+            loop_keys,seg_steps = self.V_Carve_Cache_Keys(loop_list,v_set)
+            calc_list = []
+            calc_keys = set()
+            TOT_LENGTH = 0.0
+            for loop in range(len(loop_list)):
+                key = loop_keys[loop][0]
+                if not (key in self.vcarve_cache or key in calc_keys):
+                    calc_list.append(loop)
+                    calc_keys.add(key)
+                    TOT_LENGTH = TOT_LENGTH + loop_length[loop]
+
+            ##########################################################
+            # Look for the results in the disk cache (same lines and #
+            # v-carve settings as an earlier job)                    #
+            ##########################################################
+            vdisk = None
+            vdisk_vcoords = None
+            if self.v_disk_cache.get():
+                path = fengrave_cache_dir("vcarve")
+                if path != None:
+                    try:
+                        max_size = float(self.v_cache_size.get())*1e6
+                    except:
+                        max_size = 0.0
+                    vdisk = V_Carve_Disk_Cache(path,max_size)
+                    vdisk_key = vdisk.key(self.coords,v_set)
+                    vdisk_vcoords = vdisk.read(vdisk_key)
+
+            calc_done = (len(self.coords) == 0)
+            self.v_length = [0.0, TOT_LENGTH, time(), timestamp]
+            self.v_pplot_on = settings.v_pplot
+            v_status = lambda Lseg,vcoords,start: self.V_Carve_Status(Lseg,vcoords,start,settings)
+            self.v_stop_cnt = 0
 
             ################################################################################################################
             ################################################################################################################
             ################################################################################################################
             #Update canvas with modified paths
-            if (not self.batch.get()):
+            if (not settings.batch):
                 self.Plot_Data()
 
-            if TOT_LENGTH > 0.0:
-                calc_flag=1
-                for line in range(len(self.coords)):
-                    CUR_CNT=CUR_CNT+1
-                    ####################################################
-                    if (not self.batch.get()):
-                        stamp=int(3*time()) #update every 1/3 of a second
-                        if (stamp != timestamp):
-                            timestamp=stamp #interlock
-                            
-                            ####################################################
-                            CUR_PCT=float(CUR_LENGTH)/TOT_LENGTH*100.0
-                            if CUR_PCT > 0.0:
-                                MIN_REMAIN =( time()-START_TIME )/60 * (100-CUR_PCT)/CUR_PCT
-                                MIN_TOTAL = 100.0/CUR_PCT * ( time()-START_TIME )/60
-                            else:
-                                MIN_REMAIN = -1
-                                MIN_TOTAL = -1
-                                
-                            self.statusMessage.set('%.1f %% ( %.1f Minutes Remaining | %.1f Minutes Total )' %( CUR_PCT, MIN_REMAIN, MIN_TOTAL ) )
-                            self.statusbar.configure( bg = 'yellow' )
-                            self.PreviewCanvas.update()
-
-                    if STOP_CALC != 0:
-                        STOP_CALC=0
-                        self.vcoords = []
-                        
-                    v_index = v_index + v_inc
-                    New_Loop=0
-                    x1 = self.coords[v_index][i_x1]
-                    y1 = self.coords[v_index][i_y1]
-                    x2 = self.coords[v_index][i_x2]
-                    y2 = self.coords[v_index][i_y2]
-                    char_num = int(self.coords[v_index][5])
-                    dx = x2-x1
-                    dy = y2-y1
-                    Lseg = sqrt(dx*dx + dy*dy)
-
-                    if Lseg < Zero: #was Acc
-                        continue
-                    
-                    #calculate the sin and cos of the coord transformation needed for
-                    #the distance calculations
-                    seg_sin =  dy/Lseg
-                    seg_cos = -dx/Lseg
-                    phi = Get_Angle(seg_sin,seg_cos)
-                    
-                    if calc_flag != 0:
-                        CUR_LENGTH = CUR_LENGTH + Lseg
-                    else:
-                        theta = phi         #commented out in V1.62 brought back in V1.72
-                        x0=x2               #commented out in V1.62 brought back in V1.72
-                        y0=y2               #commented out in V1.62 brought back in V1.72
-                        seg_sin0=seg_sin    #commented out in V1.62 brought back in V1.72
-                        seg_cos0=seg_cos    #commented out in V1.62 brought back in V1.72
-                        char_num0=char_num  #commented out in V1.62 brought back in V1.72
-                        continue
-
-
-                    
-                    if (fabs(x1-x0) > Zero) or (fabs(y1-y0) > Zero) or (char_num != char_num0):
-                    #if char_num != char_num0:
-                        New_Loop=1
-                        loop_cnt=loop_cnt+1
-                        xa = float(x1)
-                        ya = float(y1)
-                        xb = float(x2)
-                        yb = float(y2)
-                        theta = 9999.0
-                        seg_sin0 = 2
-                        seg_cos0 = 2
-
-                    if seg_cos0 > 1.0:
-                        delta = 180
-                    else:
-                        xtmp1 = (x2-x1) * seg_cos0 - (y2-y1) * seg_sin0
-                        ytmp1 = (x2-x1) * seg_sin0 + (y2-y1) * seg_cos0
-                        Ltmp=sqrt( xtmp1*xtmp1 + ytmp1*ytmp1 )
-                        d_seg_sin =   ytmp1/Ltmp
-                        d_seg_cos =   xtmp1/Ltmp
-                        delta = Get_Angle(d_seg_sin,d_seg_cos)
-                    if delta < float(v_drv_crner) and BIT_ANGLE !=0 and not_b_carve:
-                        #drive to corner
-                        self.vcoords.append([x1, y1, 0.0, loop_cnt])
-
-                    if delta > float(v_stp_crner):
-                       #add sub-steps around corner
-                       ###########################
-                       phisteps = max(floor((delta-180)/dangle),2)
-                       step_phi = (delta-180)/phisteps
-                       pcnt = 0
-                       while pcnt < phisteps-1:
-                           pcnt=pcnt+1
-                           sub_phi =  radians( -pcnt*step_phi + theta )
-                           sub_seg_cos = cos(sub_phi)
-                           sub_seg_sin = sin(sub_phi)
-
-                           rout = self.find_max_circle(x1,y1,rmax,char_num,sub_seg_sin,sub_seg_cos,1,CHK_STRING)
-                           xv,yv,rv=self.record_v_carve_data(x1,y1,sub_phi,rout,loop_cnt)
-                           if self.v_pplot.get() == 1 and (not self.batch.get()):
-                               self.Plot_Circ(xv,yv,midx,midy,cszw,cszh,PlotScale,"blue",rv,0)
-                       #############################
-                    ### end for linec in self.coords
-                    theta = phi
-                    x0=x2
-                    y0=y2
-                    seg_sin0=seg_sin
-                    seg_cos0=seg_cos
-                    char_num0=char_num
-
-                    #Calculate the number of steps then the dx and dy for each step
-                    #Don't calculate at the joints.
-                    nsteps = max(floor(Lseg/dline),2)
-                    dxpt = dx/nsteps
-                    dypt = dy/nsteps
-
-                    ### This makes sure the first cut start at the begining of the first segment
-                    cnt = 0
-                    if New_Loop == 1 and BIT_ANGLE !=0 and not_b_carve:
-                        cnt = -1
-
-                    seg_sin =  dy/Lseg
-                    seg_cos = -dx/Lseg
-                    phi2 = radians(Get_Angle(seg_sin,seg_cos))
-                    while cnt < nsteps-1:
-                        cnt=cnt+1
-                        #determine location of next step along outline (xpt, ypt)
-                        xpt = x1 + dxpt * cnt
-                        ypt = y1 + dypt * cnt
-
-                        rout = self.find_max_circle(xpt,ypt,rmax,char_num,seg_sin,seg_cos,0,CHK_STRING)
-                        # Make the first cut drive down at an angle instead of straight down plunge
-                        if cnt==0 and not_b_carve:
-                            rout = 0.0
-                        xv,yv,rv=self.record_v_carve_data(xpt,ypt,phi2,rout,loop_cnt)
-
-                        if self.v_pplot.get() == 1 and (not self.batch.get()):
-                            self.master.update_idletasks()
-                            self.Plot_Circ(xv,yv,midx,midy,cszw,cszh,PlotScale,"blue",rv,0)
-
-                        if (New_Loop==1 and cnt==1):
-                            xpta  = xpt
-                            ypta  = ypt
-                            phi2a = phi2
-                            routa = rout
-
-                    #################################################
-                    # Check to see if we need to close an open loop #
-                    #################################################
-                    if (abs(x2-xa) < Zero and abs(y2-ya) < Zero):
-                        xtmp1 = (xb-xa) * seg_cos0 - (yb-ya) * seg_sin0
-                        ytmp1 = (xb-xa) * seg_sin0 + (yb-ya) * seg_cos0
-                        Ltmp=sqrt( xtmp1*xtmp1 + ytmp1*ytmp1 )
-                        d_seg_sin =   ytmp1/Ltmp
-                        d_seg_cos =   xtmp1/Ltmp
-                        delta = Get_Angle(d_seg_sin,d_seg_cos)
-                        if delta < v_drv_crner:
-                            #drive to corner
-                            self.vcoords.append([xa, ya, 0.0, loop_cnt])
-
-                        elif delta > v_stp_crner:
-                            #add substeps around corner
-                            phisteps = max(floor((delta-180)/dangle),2)
-                            step_phi = (delta-180)/phisteps
-                            pcnt = 0
-
-                            while pcnt < phisteps-1:
-                                pcnt=pcnt+1
-                                sub_phi =  radians( -pcnt*step_phi + theta )
-                                sub_seg_cos = cos(sub_phi)
-                                sub_seg_sin = sin(sub_phi)
-
-                                rout = self.find_max_circle(xa,ya,rmax,char_num,sub_seg_sin,sub_seg_cos,1,CHK_STRING)
-                                xv,yv,rv = self.record_v_carve_data(xa,ya,sub_phi,rout,loop_cnt)
-                                if (self.v_pplot.get() == 1) and (not self.batch.get()):
-                                    self.Plot_Circ(xv,yv,midx,midy,cszw,cszh,PlotScale,"blue",rv,0)
-
-                            xv,yv,rv = self.record_v_carve_data(xpta,ypta,phi2a,routa,loop_cnt)
-                        else:
-                            # Add closing segment
-                            xv,yv,rv = self.record_v_carve_data(xpta,ypta,phi2a,routa,loop_cnt)
-                            
+            if len(loop_list) > 0:
+                vcache = {}
+                vcoords = vdisk_vcoords
+                if vcoords == None and self.v_parallel.get() and PARALLEL and len(calc_list) > 1:
+                    vcoords = self.V_Carve_Parallel([(loop+1,loop_list[loop]) for loop in calc_list],
+                                                    [loop_length[loop] for loop in calc_list],v_set,seg_steps,settings)
+
+                if vcoords == None:
+                    for loop in range(len(loop_list)):
+                        key = loop_keys[loop][0]
+                        if key in vcache or key in self.vcarve_cache:
+                            if not key in vcache:
+                                vcache[key] = self.vcarve_cache[key]
+                            self.vcoords.extend( v_carve_cache_get(vcache[key],loop+1,*loop_keys[loop][1:]) )
+                            continue
+                        stop_cnt = self.v_stop_cnt
+                        vcoords = v_carve_loop(self.vgrid,self.coords,loop_list[loop],loop+1,v_set,seg_steps,v_status)
+                        self.vcoords.extend(vcoords)
+                        if self.v_stop_cnt == stop_cnt:
+                            vcache[key] = v_carve_cache_put(vcoords,*loop_keys[loop][1:])
+                    self.vcarve_cache = vcache
+                    calc_done = True
+                elif STOP_CALC == 0:
+                    loop_vcoords = {}
+                    for vcoord in vcoords:
+                        loop_vcoords.setdefault(vcoord[3],[]).append(vcoord)
+                    for loop in calc_list:
+                        loop_vcoords.setdefault(loop+1,[])
+                        vcache[loop_keys[loop][0]] = v_carve_cache_put(loop_vcoords[loop+1],*loop_keys[loop][1:])
+                    for loop in range(len(loop_list)):
+                        key = loop_keys[loop][0]
+                        if loop+1 in loop_vcoords:
+                            self.vcoords.extend( loop_vcoords[loop+1] )
+                            continue
+                        if not key in vcache:
+                            vcache[key] = self.vcarve_cache[key]
+                        self.vcoords.extend( v_carve_cache_get(vcache[key],loop+1,*loop_keys[loop][1:]) )
+                    self.vcarve_cache = vcache
+                    calc_done = True
+                STOP_CALC=0
 
-                #end for line in self coords
+                if vdisk != None and vdisk_vcoords == None and calc_done and self.v_stop_cnt == 0:
+                    vdisk.write(vdisk_key,self.vcoords)
 
 
                 #Reset Entry Fields in V-Carve Settings
-                if (not self.batch.get()):
+                if (not settings.batch):
                     self.entry_set(self.Entry_Vbitangle,   self.Entry_Vbitangle_Check()   ,1)
                     self.entry_set(self.Entry_Vbitdia,     self.Entry_Vbitdia_Check()     ,1)
                     self.entry_set(self.Entry_VDepthLimit, self.Entry_VDepthLimit_Check() ,1)
                     self.entry_set(self.Entry_InsideAngle, self.Entry_InsideAngle_Check() ,1)
                     self.entry_set(self.Entry_OutsideAngle,self.Entry_OutsideAngle_Check(),1)
                     self.entry_set(self.Entry_StepSize,    self.Entry_StepSize_Check()    ,1)
+                    self.entry_set(self.Entry_StepTol,     self.Entry_StepTol_Check()     ,1)
                     self.entry_set(self.Entry_Allowance,   self.Entry_Allowance_Check()   ,1)
                     self.entry_set(self.Entry_Accuracy,    self.Entry_Accuracy_Check()    ,1)
                     self.entry_set(self.Entry_CLEAN_DIA,   self.Entry_CLEAN_DIA_Check()   ,1)
@@ -7444,7 +7666,7 @@ class Application(Frame):
                     self.entry_set(self.Entry_V_CLEAN,     self.Entry_V_CLEAN_Check()     ,1)
 
 
-            if CUR_CNT==MAX_CNT-1 and (not self.batch.get()):
+            if calc_done and (not settings.batch):
                 self.statusMessage.set('Done -- ' + self.bounding_box.get())
                 self.statusbar.configure( bg = 'white' )
             ################################################################################################################
@@ -7517,10 +7739,25 @@ class Application(Frame):
         ###  For Each open loop connect to the next closest ###
         ###  loop end until all of the loops are closed     ###
         #######################################################
+        # The open loop ends are kept in a Path_Order_Grid so the
+        # closest one is found without checking every open loop.
+        # Ties go to a loop start then to the first open loop.
+        if len(LObeg) > 0:
+            grid = Path_Order_Grid([ecoords[k][0] for k in LObeg],
+                                   [ecoords[k][1] for k in LObeg],
+                                   [ecoords[k][0] for k in LOend],
+                                   [ecoords[k][1] for k in LOend])
+        used = [False]*len(LObeg)
+        open_left = len(LObeg)
         Lcnt=0
-        while len(LObeg) > 0: #for each Open Loop
-            Start = LObeg.pop(0)
-            End   = LOend.pop(0)
+        for i in range(len(LObeg)): #for each Open Loop
+            if used[i]:
+                continue
+            used[i] = True
+            grid.remove(i)
+            open_left = open_left-1
+            Start = LObeg[i]
+            End   = LOend[i]
             Lcnt = Lcnt+1
             LNloop.append(Lcnt)
             LNbeg.append(Start)
@@ -7528,52 +7765,28 @@ class Application(Frame):
             [Xstart, Ystart] = ecoords[Start]
 
             OPEN = True
-            while OPEN == True and len(LObeg) > 0:
+            while OPEN == True and open_left > 0:
                 [Xend,Yend] = ecoords[End]
-                dist_beg_min = sqrt((Xend-Xstart)**2 +(Yend-Ystart)**2)
-                dist_end_min = dist_beg_min
-                k_min_beg = -1
-                k_min_end = -1
-                for k in range(len(LObeg)):
-                    [Xkstart, Ykstart] = ecoords[LObeg[k]]
-                    [Xkend  ,   Ykend] = ecoords[LOend[k]]
-                    dist_beg = sqrt((Xend-Xkstart)**2 +(Yend-Ykstart)**2)
-                    dist_end = sqrt((Xend - Xkend)**2 +(Yend - Ykend)**2)
-
-                    if dist_beg < dist_beg_min:
-                        dist_beg_min = dist_beg
-                        k_min_beg = k
-                    if dist_end < dist_end_min:
-                        dist_end_min = dist_end
-                        k_min_end = k
-
-                if k_min_beg == -1 and k_min_end == -1:
-                    kbeg = End
-                    kend = Start
+                dist_close = sqrt((Xend-Xstart)**2 +(Yend-Ystart)**2)
+                dist2,use_end,k = grid.nearest(Xend,Yend)
+
+                if not sqrt(dist2) < dist_close:
                     ecoords.append(ecoords[End])
                     ecoords.append(ecoords[Start])
                     LNloop.append(Lcnt)
                     LNbeg.append(len(ecoords)-2)
                     LNend.append(len(ecoords)-1)
                     OPEN = False
-
-                elif dist_end_min < dist_beg_min:
-                    kend = LObeg.pop(k_min_end)
-                    kbeg = LOend.pop(k_min_end)
-
-                    ecoords.append(ecoords[End])
-                    ecoords.append(ecoords[kbeg])
-
-                    LNloop.append(Lcnt)
-                    LNbeg.append(len(ecoords)-2)
-                    LNend.append(len(ecoords)-1)
-                    LNloop.append(Lcnt)
-                    LNbeg.append(kbeg)
-                    LNend.append(kend)
-                    End  = kend
                 else:
-                    kbeg = LObeg.pop(k_min_beg)
-                    kend = LOend.pop(k_min_beg)
+                    used[k] = True
+                    grid.remove(k)
+                    open_left = open_left-1
+                    if use_end:
+                        kend = LObeg[k]
+                        kbeg = LOend[k]
+                    else:
+                        kbeg = LObeg[k]
+                        kend = LOend[k]
 
                     ecoords.append(ecoords[End])
                     ecoords.append(ecoords[kbeg])
@@ -7586,7 +7799,7 @@ class Application(Frame):
                     LNend.append(kend)
                     End  = kend
 
-            if OPEN == True and len(LObeg) == 0:
+            if OPEN == True and open_left == 0:
                 ecoords.append(ecoords[End])
                 ecoords.append(ecoords[Start])
                 LNloop.append(Lcnt)
@@ -7646,6 +7859,7 @@ class Application(Frame):
             self.master.update()
         Lflip = []
         Lcw   = []
+        Lbox  = []
 
         for k in range(len(Lbeg)):
             Start = Lbeg[k]
@@ -7655,11 +7869,17 @@ class Application(Frame):
             signedArea=0.0
 
             [x1,y1]   = ecoords[Start]
+            xmin,xmax,ymin,ymax = x1,x1,y1,y1
             for i in range(Start+1,End+step,step):
                 [x2,y2]   = ecoords[i]
                 signedArea += (x2-x1)*(y2+y1)
                 x1=x2
                 y1=y2
+                if x2 < xmin: xmin = x2
+                elif x2 > xmax: xmax = x2
+                if y2 < ymin: ymin = y2
+                elif y2 > ymax: ymax = y2
+            Lbox.append([xmin,xmax,ymin,ymax])
             if signedArea > 0.0:
                 Lflip.append(False)
                 Lcw.append(True)
@@ -7677,6 +7897,13 @@ class Application(Frame):
         #####################################################
         # For each loop determine if other loops are inside #
         #####################################################
+        # Only loops that start inside the bounding box of a loop can
+        # be inside of it.  The loop start points are sorted by x so
+        # the ones in the x range of the box are found by bisection.
+        Jx = [ecoords[Lbeg[jloop]][0] for jloop in range(Nloops)]
+        Jy = [ecoords[Lbeg[jloop]][1] for jloop in range(Nloops)]
+        Jorder = sorted(range(Nloops), key=lambda jloop: Jx[jloop])
+        Jx_sort = [Jx[jloop] for jloop in Jorder]
         timestamp = 0
         global STOP_CALC
         STOP_CALC = 0
@@ -7694,17 +7921,21 @@ class Application(Frame):
 
             ## Check points in other loops (could just check one) ##
             if ipoly != []:
-                for jloop in range(Nloops):
-                    if jloop != iloop:
-                        inside = 0
-                        #for jval in range(Lbeg[jloop],Lend[jloop]):
-                        #    inside = inside + self.point_inside_polygon(ecoords[jval][0],ecoords[jval][1],ipoly)
-                        jval = Lbeg[jloop]
-                        inside = inside + self.point_inside_polygon(ecoords[jval][0],ecoords[jval][1],ipoly)
-                        if inside > 0:
-                            Lflip[jloop] = not Lflip[jloop]
-                            LoopTree[iloop][1].append(jloop)
-                            LoopTree[jloop][2].append(iloop)
+                [xmin,xmax,ymin,ymax] = Lbox[iloop]
+                check = []
+                for k in range(bisect_left(Jx_sort,xmin),bisect_right(Jx_sort,xmax)):
+                    jloop = Jorder[k]
+                    if jloop != iloop and Jy[jloop] > ymin and Jy[jloop] <= ymax:
+                        check.append(jloop)
+                check.sort()
+                inside = self.points_inside_polygon([Jx[jloop] for jloop in check],
+                                                    [Jy[jloop] for jloop in check],ipoly)
+                for k in range(len(check)):
+                    if inside[k] > 0:
+                        jloop = check[k]
+                        Lflip[jloop] = not Lflip[jloop]
+                        LoopTree[iloop][1].append(jloop)
+                        LoopTree[jloop][2].append(iloop)
 
         #####################################################
         # Set Loop clockwise flag to the state of each loop #
@@ -7836,7 +8067,9 @@ class Application(Frame):
         return path_coords_out
 
     
-    def Clean_Path_Calc(self,bit_type="straight"):
+    def Clean_Path_Calc(self,bit_type="straight",settings=None):
+        if settings == None:
+            settings = Calc_Settings(self)
         v_flop  = self.get_flop_status(CLEAN_FLAG=True)
         edge=0
         if v_flop:
@@ -7876,14 +8109,14 @@ class Application(Frame):
         else:
             test_clean = self.v_clean_P.get() + self.v_clean_Y.get() + self.v_clean_X.get() + self.v_clean_L.get()
 
-        rbit = self.calc_vbit_dia() / 2.0
+        rbit = settings.vbit_dia / 2.0
         
         self.statusbar.configure( bg = 'yellow' )
         if bit_type=="straight":
             self.statusMessage.set('Calculating Cleanup Cut Paths')
             self.master.update()
-            clean_dia = float(self.clean_dia.get()) #diameter of cleanup bit 
-            v_step_len = float(self.v_step_len.get()) 
+            clean_dia = settings.clean_dia #diameter of cleanup bit 
+            v_step_len = settings.v_step_len 
             step_over = float(self.clean_step.get()) #percent of cut DIA
             clean_step = step_over/100.0
             Radjust   = clean_dia/2.0 + rbit
@@ -7900,9 +8133,9 @@ class Application(Frame):
             # v-clean step of the v-carved surface.
             offset = clean_dia/4.0 
             Radjust   =  rbit + offset
-            flat_clean_r = float(self.clean_dia.get())/2.0
+            flat_clean_r = settings.clean_dia/2.0
 
-        if self.cut_type.get() == "v-carve"  and test_clean > 0:
+        if settings.cut_type == "v-carve"  and test_clean > 0:
             DX = clean_dia*clean_step
             DY = DX
             if bit_type=="straight":
@@ -7937,7 +8170,7 @@ class Application(Frame):
                 # Offset with pyclipper to find the area that needs to be cleaned
                 if len(clip_coords)>0:
                     # Adjust loops out by Radjust_Step01 to match the tool path of full depth cut
-                    Radjust_Step01 = float(self.clean_dia.get())/2.0 + rbit
+                    Radjust_Step01 = settings.clean_dia/2.0 + rbit
                     offset_val     = -Radjust_Step01*10000.0
                     clean_loops    = pco.Execute(offset_sign*offset_val)
 
@@ -7945,7 +8178,7 @@ class Application(Frame):
                     for path in clean_loops:
                         pco_Step02.AddPath(path, pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
                     # Adjust loops out by Radjust_Step21 to match the max extent the straigh tool reached (plus a little)
-                    Radjust_Step02 = float(self.clean_dia.get())/2.0 + clean_dia/4.0
+                    Radjust_Step02 = settings.clean_dia/2.0 + clean_dia/4.0
                     clean_loops = pco_Step02.Execute(offset_sign*Radjust_Step02*10000)
 
                     # Make loops that are on the toolpath of full depth cuts (minus a little)
@@ -8005,10 +8238,12 @@ class Application(Frame):
                 Ysteps = ceil( Ysize /(clean_dia*clean_step) )
                 if (Ysteps>0):
                     dY = Ysize / Ysteps
+                    y_list = [y_pmin_x + iY/Ysteps * (y_pmax_x-y_pmin_x) for iY in range(0,int(Ysteps+1))]
+                    y_check = self.Scanline_Edges(loop_coords,y_list,horizontal=True)
                     for iY in range(0,int(Ysteps+1)):
-                        y = y_pmin_x + iY/Ysteps * (y_pmax_x-y_pmin_x)
+                        y = y_list[iY]
                         intXYlist=[]
-                        intXYlist = self.DetectIntersect([x_pmin-1,y],[x_pmax+1,y],loop_coords,XY_T_F=True)
+                        intXYlist = self.DetectIntersect([x_pmin-1,y],[x_pmax+1,y],loop_coords,XY_T_F=True,check=y_check[iY])
                         intXY_len = len(intXYlist)
 
                         for i in range(edge,intXY_len-1-edge,2):
@@ -8032,10 +8267,12 @@ class Application(Frame):
                 Xsteps = ceil( Xsize /(clean_dia*clean_step) )
                 if (Xsteps>0):
                     dX = Xsize / Xsteps
+                    x_list = [x_pmin_y + iX/Xsteps * (x_pmax_y-x_pmin_y) for iX in range(0,int(Xsteps+1))]
+                    x_check = self.Scanline_Edges(loop_coords,x_list,horizontal=False)
                     for iX in range(0,int(Xsteps+1)):
-                        x = x_pmin_y + iX/Xsteps * (x_pmax_y-x_pmin_y)
+                        x = x_list[iX]
                         intXYlist=[]
-                        intXYlist = self.DetectIntersect([x,y_pmin-1],[x,y_pmax+1],loop_coords,XY_T_F=True)
+                        intXYlist = self.DetectIntersect([x,y_pmin-1],[x,y_pmax+1],loop_coords,XY_T_F=True,check=x_check[iX])
                         intXY_len = len(intXYlist)
                         for i in range(edge,intXY_len-1-edge,2):
                             x1 = intXYlist[i][0]
@@ -8052,23 +8289,15 @@ class Application(Frame):
             ##################################################
             if ( (((self.clean_L.get() == 1) and (not v_flop)) and bit_type=="straight") or
                 (self.v_clean_L.get() == 1 and bit_type == "v-bit" )):
-                pco_loop_clean = pyclipper.PyclipperOffset()
-                for path in clean_loops:
-                    pco_loop_clean.AddPath(path, pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
-                
                 if len(clip_coords)>0:
                     DL = clean_dia*clean_step/2
-                    offset_val = 0
-                    while True:
-                        offset_val=offset_val-DL*10000.0
-                        offset_coords = pco_loop_clean.Execute(offset_val)
-                        if len(offset_coords)>0:
+                    islands = clean_loop_islands(clean_loops)
+                    for rings in self.Clean_Loop_Rings(islands,DL):
+                        for offset_coords in rings:
                             P_coords  = self.pyclipper_coords2ecoords(offset_coords,clean_dia=clean_dia,Ln_last=loop_cnt)
                             clean_coords_out.extend(P_coords)
                             if len(clean_coords_out)>0:
                                 loop_cnt = clean_coords_out[-1][3]
-                        if len(offset_coords)==0:
-                            break                                
             ################################################################################
 
             ###########################################################
@@ -8153,10 +8382,46 @@ class Application(Frame):
 
 
 
+    #####################################################
+    ### Find the lines that may cross each scan line
+    #####################################################
+    # The lines in lcoords are sorted by their lowest y (or x for vertical
+    # scan lines) and kept in an active list while the scan lines at the
+    # values in scan_list pass over them.  Returns a list of the lcoords
+    # indexes for each scan line (used as check in DetectIntersect).
+    def Scanline_Edges(self,lcoords,scan_list,horizontal=True):
+        # Lines within 2*Zero (the tolerance used in
+        # DetectIntersect) of a scan line are included
+        pad = 2e-6
+        if horizontal:
+            i_s = 1
+        else:
+            i_s = 0
+        edges = []
+        for ii in range(len(lcoords)):
+            s1 = lcoords[ii][i_s]
+            s2 = lcoords[ii][i_s+2]
+            edges.append( (min(s1,s2)-pad, max(s1,s2)+pad, ii) )
+        edges.sort()
+
+        scan_order = sorted(range(len(scan_list)), key=lambda k: scan_list[k])
+        scan_check = [[]]*len(scan_list)
+        active = []
+        i_edge = 0
+        for k in scan_order:
+            s = scan_list[k]
+            while i_edge < len(edges) and edges[i_edge][0] <= s:
+                active.append(edges[i_edge])
+                i_edge = i_edge + 1
+            active = [edge for edge in active if edge[1] >= s]
+            scan_check[k] = [edge[2] for edge in active]
+        return scan_check
+
     #####################################################
     ### Find intersecting lines
+    ### (only the lines in check are tested if given)
     #####################################################
-    def DetectIntersect(self, Coords0,Coords1,lcoords,XY_T_F=True):
+    def DetectIntersect(self, Coords0,Coords1,lcoords,XY_T_F=True,check=None):
         [x0,y0]=Coords0
         [x1,y1]=Coords1
         Zero = 1e-6
@@ -8179,8 +8444,10 @@ class Application(Frame):
         seg_sin = dy/len_seg
         seg_cos = dx/len_seg    
         Xint_local = 0
-        
-        for ii in range(0,numcoords):
+
+        if check == None:
+            check = range(0,numcoords)
+        for ii in check:
             x2 = lcoords[ii][0]
             y2 = lcoords[ii][1]      
             x3 = lcoords[ii][2]
@@ -8325,7 +8592,7 @@ class Application(Frame):
 #                         General Settings Window                              #
 ################################################################################
     def GEN_Settings_Window(self):
-        gen_settings = Toplevel(width=600, height=500)
+        gen_settings = Toplevel(width=600, height=572)
         gen_settings.grab_set() # Use grab_set to prevent user input in the main window during calculations
         gen_settings.resizable(0,0)
         gen_settings.title('Settings')
@@ -8507,6 +8774,54 @@ class Application(Frame):
         self.Checkbutton_v_pplot = Checkbutton(gen_settings,text="", anchor=W)
         self.Checkbutton_v_pplot.place(x=xd_entry_L, y=D_Yloc, width=75, height=23)
         self.Checkbutton_v_pplot.configure(variable=self.v_pplot)
+
+        D_Yloc=D_Yloc+D_dY
+        self.Label_v_parallel = Label(gen_settings,text="Parallel V-Carve and Clean Up")
+        self.Label_v_parallel.place(x=xd_label_L, y=D_Yloc, width=w_label, height=21)
+        self.Checkbutton_v_parallel = Checkbutton(gen_settings,text="", anchor=W)
+        self.Checkbutton_v_parallel.place(x=xd_entry_L, y=D_Yloc, width=75, height=23)
+        self.Checkbutton_v_parallel.configure(variable=self.v_parallel)
+        if not PARALLEL:
+            self.Checkbutton_v_parallel.configure(state="disabled")
+
+        D_Yloc=D_Yloc+D_dY
+        self.Label_path_opt = Label(gen_settings,text="Optimize Path Order (2-opt)")
+        self.Label_path_opt.place(x=xd_label_L, y=D_Yloc, width=w_label, height=21)
+        self.Checkbutton_path_opt = Checkbutton(gen_settings,text="", anchor=W)
+        self.Checkbutton_path_opt.place(x=xd_entry_L, y=D_Yloc, width=75, height=23)
+        self.Checkbutton_path_opt.configure(variable=self.path_opt)
+
+        D_Yloc=D_Yloc+D_dY
+        self.Label_v_disk_cache = Label(gen_settings,text="V-Carve Disk Cache")
+        self.Label_v_disk_cache.place(x=xd_label_L, y=D_Yloc, width=w_label, height=21)
+        self.Checkbutton_v_disk_cache = Checkbutton(gen_settings,text="", anchor=W)
+        self.Checkbutton_v_disk_cache.place(x=xd_entry_L, y=D_Yloc, width=75, height=23)
+        self.Checkbutton_v_disk_cache.configure(variable=self.v_disk_cache)
+        self.Label_v_cache_size = Label(gen_settings,text="Size Limit:", anchor=E)
+        self.Label_v_cache_size.place(x=xd_entry_L+30, y=D_Yloc, width=75, height=21)
+        self.Entry_v_cache_size = Entry(gen_settings,width="15")
+        self.Entry_v_cache_size.place(x=xd_entry_L+110, y=D_Yloc, width=w_entry, height=23)
+        self.Entry_v_cache_size.configure(textvariable=self.v_cache_size)
+        self.v_cache_size.trace_variable("w", self.Entry_v_cache_size_Callback)
+        self.entry_set(self.Entry_v_cache_size,self.Entry_v_cache_size_Check(),2)
+        self.Label_v_cache_size_u = Label(gen_settings,text="MB", anchor=W)
+        self.Label_v_cache_size_u.place(x=xd_entry_L+175, y=D_Yloc, width=w_units, height=21)
+
+        D_Yloc=D_Yloc+D_dY
+        self.Label_font_disk_cache = Label(gen_settings,text="Font Disk Cache")
+        self.Label_font_disk_cache.place(x=xd_label_L, y=D_Yloc, width=w_label, height=21)
+        self.Checkbutton_font_disk_cache = Checkbutton(gen_settings,text="", anchor=W)
+        self.Checkbutton_font_disk_cache.place(x=xd_entry_L, y=D_Yloc, width=75, height=23)
+        self.Checkbutton_font_disk_cache.configure(variable=self.font_disk_cache)
+        self.Label_font_cache_size = Label(gen_settings,text="Size Limit:", anchor=E)
+        self.Label_font_cache_size.place(x=xd_entry_L+30, y=D_Yloc, width=75, height=21)
+        self.Entry_font_cache_size = Entry(gen_settings,width="15")
+        self.Entry_font_cache_size.place(x=xd_entry_L+110, y=D_Yloc, width=w_entry, height=23)
+        self.Entry_font_cache_size.configure(textvariable=self.font_cache_size)
+        self.font_cache_size.trace_variable("w", self.Entry_font_cache_size_Callback)
+        self.entry_set(self.Entry_font_cache_size,self.Entry_font_cache_size_Check(),2)
+        self.Label_font_cache_size_u = Label(gen_settings,text="MB", anchor=W)
+        self.Label_font_cache_size_u.place(x=xd_entry_L+175, y=D_Yloc, width=w_units, height=21)
         
         D_Yloc=D_Yloc+D_dY+10
         self.Label_SaveConfig = Label(gen_settings,text="Configuration File")
@@ -8537,7 +8852,7 @@ class Application(Frame):
     #                         V-Carve Settings window                              #
     ################################################################################
     def VCARVE_Settings_Window(self):
-        vcarve_settings = Toplevel(width=580, height=690)
+        vcarve_settings = Toplevel(width=580, height=714)
         vcarve_settings.grab_set() # Use grab_set to prevent user input in the main window during calculations
         vcarve_settings.resizable(0,0)
         vcarve_settings.title('V-Carve Settings')
@@ -8626,6 +8941,19 @@ class Application(Frame):
         self.v_step_len.trace_variable("w", self.Entry_StepSize_Callback)
         self.entry_set(self.Entry_StepSize, self.Entry_StepSize_Check(),2)
 
+        D_Yloc=D_Yloc+D_dY
+        self.Label_StepTol = Label(vcarve_settings,text="Adaptive Step Tolerance")
+        self.Label_StepTol.place(x=xd_label_L, y=D_Yloc, width=w_label, height=21)
+        self.Label_StepTol_u = Label(vcarve_settings,textvariable=self.units, anchor=W)
+        self.Label_StepTol_u.place(x=xd_units_L, y=D_Yloc, width=w_units, height=21)
+        self.Label_right_StepTol = Label(vcarve_settings,text="(Heuristic, zero disables)", anchor=W)
+        self.Label_right_StepTol.place(x=xd_units_L+20, y=D_Yloc, width=w_label, height=21)
+        self.Entry_StepTol = Entry(vcarve_settings,width="15")
+        self.Entry_StepTol.place(x=xd_entry_L, y=D_Yloc, width=w_entry, height=23)
+        self.Entry_StepTol.configure(textvariable=self.v_step_tol)
+        self.v_step_tol.trace_variable("w", self.Entry_StepTol_Callback)
+        self.entry_set(self.Entry_StepTol, self.Entry_StepTol_Check(),2)
+
         D_Yloc=D_Yloc+D_dY+12
         self.vcarve_separator00 = Frame(vcarve_settings,height=2, bd=1, relief=SUNKEN)
         self.vcarve_separator00.place(x=0, y=D_Yloc,width=580, height=2)
@@ -8895,6 +9223,1238 @@ class Application(Frame):
         self.VCARVE_Close.place(x=Xbut, y=Ybut, width=130, height=30, anchor="w")
         self.VCARVE_Close.bind("<ButtonRelease-1>", self.Close_Current_Window_Click)
 
+################################################################################
+#     Grid partitions of the line segments used for v-carve calculations.      #
+#     The line data is stored once in flat arrays (x1,y1,x2,y2,char number and #
+#     the bounding circle X_B,Y_B,R_B).  The line numbers in each partition    #
+#     are stored in cell_lines, the lines for cell c are found between         #
+#     cell_start[c] and cell_start[c+1].  (c = xIndex*yN + yIndex)             #
+################################################################################
+################################################################################
+#  Snapshot of the settings used by the calculations.  It is made once for    #
+#  each user action (or batch run) and passed to the routines that do the    #
+#  work so the Tk variables are not read in the loops.  The numbers (v-carve #
+#  and clean up values) are only found the first time they are used, so an   #
+#  engrave job does not need valid v-carve entries.  After that the same     #
+#  value is used for the rest of the action.  The values can not be changed. #
+################################################################################
+class Calc_Settings:
+    def __init__(self,app):
+        values = self.__dict__
+        values['app']           = app
+        values['batch']         = app.batch.get()
+        values['cut_type']      = app.cut_type.get()
+        values['input_type']    = app.input_type.get()
+        values['upper']         = app.upper.get()
+        values['justify']       = app.justify.get()
+        values['bit_shape']     = app.bit_shape.get()
+        values['inlay']         = app.inlay.get()
+        values['v_pplot']       = app.v_pplot.get()
+
+    def __getattr__(self,name):
+        values = self.__dict__
+        app = values['app']
+        if   name == 'v_step_len':
+            value = float(app.v_step_len.get())
+        elif name == 'v_step_tol':
+            value = float(app.v_step_tol.get())
+        elif name == 'clean_dia':
+            value = float(app.clean_dia.get())
+        elif name == 'vbit_dia':
+            value = app.calc_vbit_dia()
+        elif name == 'r_inlay_depth':
+            value = app.calc_r_inlay_depth()
+        elif name == 'r_inlay_top':
+            value = app.calc_r_inlay_top()
+        else:
+            raise AttributeError(name)
+        values[name] = value
+        return value
+
+    def __setattr__(self,name,value):
+        raise AttributeError("Calc_Settings values can not be changed")
+
+
+################################################################################
+#  Grid of the start and end points of a set of loops used to find the       #
+#  nearest loop end when ordering paths.  The points are kept in square      #
+#  cells and removed as the loops are used.                                  #
+################################################################################
+class Path_Order_Grid:
+    def __init__(self,Xbeg,Ybeg,Xend,Yend,ends=True):
+        npts = len(Xbeg)
+        self.xmin = min(min(Xbeg),min(Xend))
+        self.ymin = min(min(Ybeg),min(Yend))
+        xmax = max(max(Xbeg),max(Xend))
+        ymax = max(max(Ybeg),max(Yend))
+        self.cell = max(xmax-self.xmin, ymax-self.ymin, Zero) / max(sqrt(npts),1.0)
+        self.nx = int((xmax-self.xmin)/self.cell)+1
+        self.ny = int((ymax-self.ymin)/self.cell)+1
+
+        self.cells = {}
+        self.entries = []
+        for loop in range(npts):
+            entries = [self.add(Xbeg[loop],Ybeg[loop],0,loop)]
+            if ends:
+                entries.append(self.add(Xend[loop],Yend[loop],1,loop))
+            self.entries.append(entries)
+
+    def index(self,x,y):
+        return int((x-self.xmin)/self.cell), int((y-self.ymin)/self.cell)
+
+    def add(self,x,y,use_end,loop):
+        key = self.index(x,y)
+        entry = (x,y,use_end,loop)
+        self.cells.setdefault(key,[]).append(entry)
+        return (key,entry)
+
+    def remove(self,loop):
+        for key,entry in self.entries[loop]:
+            self.cells[key].remove(entry)
+            if self.cells[key] == []:
+                del self.cells[key]
+
+    ##########################################################
+    # Find the nearest loop start (or end) to xcur,ycur.     #
+    # Returns (distance squared, use_end, loop).  Ties go to #
+    # a loop start then to the lowest loop number.           #
+    ##########################################################
+    def nearest(self,xcur,ycur):
+        cx,cy = self.index(xcur,ycur)
+        best = None
+        ring = 0
+        checked = 0
+        while True:
+            if checked > len(self.cells):
+                # most cells are empty, check all of the points left
+                for entries in self.cells.values():
+                    best = self.check(xcur,ycur,entries,best)
+                return best
+            if ring == 0:
+                keys = [(cx,cy)]
+            else:
+                keys = []
+                for i in range(cx-ring,cx+ring+1):
+                    keys.append((i,cy-ring))
+                    keys.append((i,cy+ring))
+                for j in range(cy-ring+1,cy+ring):
+                    keys.append((cx-ring,j))
+                    keys.append((cx+ring,j))
+            for key in keys:
+                checked = checked + 1
+                if key in self.cells:
+                    best = self.check(xcur,ycur,self.cells[key],best)
+            # points outside of the rings checked are at least ring*cell away
+            if best != None and (ring*self.cell)**2 > best[0]*(1.0+1e-9):
+                return best
+            ring = ring + 1
+            if ring > self.nx + self.ny:
+                return best
+
+    def check(self,xcur,ycur,entries,best):
+        for x,y,use_end,loop in entries:
+            dx = xcur - x
+            dy = ycur - y
+            near = (dx*dx + dy*dy, use_end, loop)
+            if best == None or near < best:
+                best = near
+        return best
+
+################################################################################
+#  Order loops by going to the nearest start (or end if ends is True) of the #
+#  loops that are left.  The first loop is always cut first.  If max_time    #
+#  seconds pass the rest of the loops are added in their original order.    #
+#  Returns a list of [loop,flip] where flip is True if the loop is cut from  #
+#  end to start.                                                             #
+################################################################################
+def path_order(Xbeg,Ybeg,Xend,Yend,ends=True,max_time=None):
+    nloops = len(Xbeg)
+    if nloops == 0:
+        return []
+    t0 = time()
+    grid = Path_Order_Grid(Xbeg,Ybeg,Xend,Yend,ends)
+    grid.remove(0)
+    order = [[0,False]]
+    xcur = Xend[0]
+    ycur = Yend[0]
+    for i in range(nloops-1):
+        if max_time != None and time()-t0 > max_time:
+            used = set([loop for loop,flip in order])
+            order.extend([[loop,False] for loop in range(nloops) if not loop in used])
+            break
+        dist,flip,loop = grid.nearest(xcur,ycur)
+        grid.remove(loop)
+        order.append([loop,bool(flip)])
+        if flip:
+            xcur = Xbeg[loop]
+            ycur = Ybeg[loop]
+        else:
+            xcur = Xend[loop]
+            ycur = Yend[loop]
+    return order
+
+def path_order_points(order,Xbeg,Ybeg,Xend,Yend):
+    start = []
+    end   = []
+    for loop,flip in order:
+        if flip:
+            start.append((Xend[loop],Yend[loop]))
+            end.append(  (Xbeg[loop],Ybeg[loop]))
+        else:
+            start.append((Xbeg[loop],Ybeg[loop]))
+            end.append(  (Xend[loop],Yend[loop]))
+    return start,end
+
+def path_order_travel(order,Xbeg,Ybeg,Xend,Yend):
+    start,end = path_order_points(order,Xbeg,Ybeg,Xend,Yend)
+    travel = 0.0
+    for i in range(1,len(order)):
+        travel = travel + hypot(start[i][0]-end[i-1][0], start[i][1]-end[i-1][1])
+    return travel
+
+################################################################################
+#  Improve a path order with 2-opt moves (reversing part of the order and    #
+#  the direction of the loops in it) when that reduces the rapid travel.    #
+#  Only moves within window loops of each other are tried.  The passes stop #
+#  when no move helps (or after max_time seconds if it is given).  The      #
+#  first loop stays first.                                                  #
+################################################################################
+def path_order_2opt(order,Xbeg,Ybeg,Xend,Yend,window=50,max_time=None):
+    order = [list(item) for item in order]
+    start,end = path_order_points(order,Xbeg,Ybeg,Xend,Yend)
+    dist = lambda p,q: hypot(p[0]-q[0],p[1]-q[1])
+    n = len(order)
+    t0 = time()
+    improved = True
+    while improved and (max_time == None or time()-t0 < max_time):
+        improved = False
+        for i in range(1,n):
+            for j in range(i,min(n,i+window)):
+                delta = dist(end[i-1],end[j]) - dist(end[i-1],start[i])
+                if j+1 < n:
+                    delta = delta + dist(start[i],start[j+1]) - dist(end[j],start[j+1])
+                if delta < -Zero:
+                    order[i:j+1] = [[loop,not flip] for loop,flip in reversed(order[i:j+1])]
+                    start[i:j+1], end[i:j+1] = end[i:j+1][::-1], start[i:j+1][::-1]
+                    improved = True
+            if max_time != None and time()-t0 > max_time:
+                break
+    return order
+
+
+class V_Carve_Grid:
+    def __init__(self,coords,MINX,MAXX,MINY,MAXY,rmax,dline):
+        global Zero
+        self.MINX = MINX
+        self.MINY = MINY
+        self.rmax = rmax
+        self.partition_arrays = {}
+        self.numpy_lines = None
+        #########################
+        # Setup Grid Partitions #
+        #########################
+        xLength = MAXX-MINX
+        yLength = MAXY-MINY
+
+        xN=0
+        yN=0
+
+        xN_minus_1 = max(int(xLength/((2*rmax+dline)*1.1)),1)
+        yN_minus_1 = max(int(yLength/((2*rmax+dline)*1.1)),1)
+
+        xPartitionLength=xLength/xN_minus_1
+        yPartitionLength=yLength/yN_minus_1
+
+        xN = xN_minus_1+1
+        yN = yN_minus_1+1
+
+        if (xPartitionLength<Zero):
+            xPartitionLength=1
+        if (yPartitionLength<Zero):
+            yPartitionLength=1
+        self.xPartitionLength = xPartitionLength
+        self.yPartitionLength = yPartitionLength
+        self.xN = xN
+        self.yN = yN
+
+        self.x1  = array('d')
+        self.y1  = array('d')
+        self.x2  = array('d')
+        self.y2  = array('d')
+        self.cn  = array('l')
+        self.X_B = array('d')
+        self.Y_B = array('d')
+        self.R_B = array('d')
+        cell_codes = array('l')
+        code_lines = array('l')
+
+        ###############################
+        # End Setup Grid Partitions   #
+        ###############################
+
+        CUR_CNT=-1
+        while (len(coords) > CUR_CNT+1):
+            CUR_CNT=CUR_CNT+1
+            XY_R = coords[CUR_CNT]
+            x1_R = XY_R[0]
+            y1_R = XY_R[1]
+            x2_R = XY_R[2]
+            y2_R = XY_R[3]
+            LENGTH = sqrt( (x2_R-x1_R)*(x2_R-x1_R) + (y2_R-y1_R)*(y2_R-y1_R) )
+
+            R_R = LENGTH/2 + rmax
+            X_R = (x1_R + x2_R)/2
+            Y_R = (y1_R + y2_R)/2
+
+            #####################################################
+            # Determine active partitions for each line segment #
+            #####################################################
+            coded_index=[]
+            ## find the local coordinates of the line segment ends
+            x1_G = XY_R[0]-MINX
+            y1_G = XY_R[1]-MINY
+            x2_G = XY_R[2]-MINX
+            y2_G = XY_R[3]-MINY
+
+            ## Find the grid box index for each line segment end
+            X1i = int( x1_G / xPartitionLength )
+            X2i = int( x2_G / xPartitionLength )
+            Y1i = int( y1_G / yPartitionLength )
+            Y2i = int( y2_G / yPartitionLength )
+
+            ## Find the max/min grid box locations
+            Xindex_min = min(X1i,X2i)
+            Xindex_max = max(X1i,X2i)
+            Yindex_min = min(Y1i,Y2i)
+            Yindex_max = max(Y1i,Y2i)
+
+            check_points=[]
+            if (Xindex_max > Xindex_min) and (abs(x2_G-x1_G) > Zero):
+                if (Yindex_max > Yindex_min) and (abs(y2_G-y1_G) > Zero):
+                    check_points.append([X1i,Y1i])
+                    check_points.append([X2i,Y2i])
+                    ## Establish line equation variables: y=m*x+b
+                    m_G = (y2_G-y1_G)/(x2_G-x1_G)
+                    b_G = y1_G - m_G*x1_G
+                    ## Add check point in each partition in the range of X values
+                    x_ind_check = Xindex_min+1
+                    while x_ind_check <= Xindex_max-1:
+                        x_val = x_ind_check * xPartitionLength
+                        y_val = m_G * x_val + b_G
+                        y_ind_check = int(y_val/yPartitionLength)
+                        check_points.append([x_ind_check,y_ind_check])
+                        x_ind_check = x_ind_check + 1
+                    ## Add check point in each partition in the range of Y values
+                    y_ind_check = Yindex_min+1
+                    while y_ind_check <= Yindex_max-1:
+                        y_val =  y_ind_check * yPartitionLength
+                        x_val = (y_val-b_G ) / m_G
+                        x_ind_check = int(x_val/xPartitionLength)
+                        check_points.append([x_ind_check,y_ind_check])
+                        y_ind_check = y_ind_check + 1
+                else:
+                    x_ind_check = Xindex_min
+                    y_ind_check = Yindex_min
+                    while x_ind_check <= Xindex_max:
+                        check_points.append([x_ind_check,y_ind_check])
+                        x_ind_check = x_ind_check + 1
+            else:
+                x_ind_check = Xindex_min
+                y_ind_check = Yindex_min
+                while y_ind_check <= Yindex_max:
+                    check_points.append([x_ind_check,y_ind_check])
+                    y_ind_check = y_ind_check + 1
+
+            ## For each grid box in check_points add the grid box and all adjacent grid boxes
+            ## to the list of boxes for this line segment
+            for xy_point in check_points:
+                xy_p = xy_point
+                xIndex = xy_p[0]
+                yIndex = xy_p[1]
+                for i in range( max(xIndex-1,0), min(xN,xIndex+2) ):
+                    for j in range( max(yIndex-1,0), min(yN,yIndex+2) ):
+                        coded_index.append(int(i+j*xN))
+
+            codedIndexSet= set(coded_index)
+
+            self.x1.append(x1_R)
+            self.y1.append(y1_R)
+            self.x2.append(x2_R)
+            self.y2.append(y2_R)
+            self.cn.append(int(XY_R[5]))
+            self.X_B.append(X_R)
+            self.Y_B.append(Y_R)
+            self.R_B.append(R_R)
+            for thisCode in codedIndexSet:
+                thisIndex = thisCode
+                cell_codes.append( int(thisIndex%xN)*yN + int(thisIndex/xN) )
+                code_lines.append( CUR_CNT )
+        #########################################################
+        # End Determine active partitions for each line segment #
+        #########################################################
+
+        ## Sort the line numbers by partition (lines stay in order in each partition)
+        ncells = xN*yN
+        cell_start = [0]*(ncells+1)
+        for code in cell_codes:
+            cell_start[code+1] = cell_start[code+1]+1
+        for code in range(ncells):
+            cell_start[code+1] = cell_start[code+1] + cell_start[code]
+        self.cell_start = array('l',cell_start)
+        self.cell_lines = array('l',[0])*len(code_lines)
+        for i in range(len(code_lines)):
+            code = cell_codes[i]
+            self.cell_lines[cell_start[code]] = code_lines[i]
+            cell_start[code] = cell_start[code]+1
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['partition_arrays'] = {}
+        state['numpy_lines'] = None
+        return state
+
+    def get_cell_lines(self,xIndex,yIndex):
+        if xIndex < 0 or yIndex < 0 or xIndex >= self.xN or yIndex >= self.yN:
+            return []
+        code = xIndex*self.yN + yIndex
+        return self.cell_lines[self.cell_start[code]:self.cell_start[code+1]]
+
+    ############################################################################
+    # Routine finds the maximum radius that can be placed in the position      #
+    # xpt,ypt witout interfearing with other line segments (rmin is max R LOL) #
+    ############################################################################
+    #def find_max_circle(self,xpt,ypt,rmin,char_num,seg_sin,seg_cos,corner,Acc_delete,CHK_STRING):
+    def find_max_circle(self,xpt,ypt,rmin,char_num,seg_sin,seg_cos,corner,CHK_STRING):
+        global Zero
+        xIndex = int((xpt-self.MINX)/self.xPartitionLength)
+        yIndex = int((ypt-self.MINY)/self.yPartitionLength)
+
+        coords_check=[]
+        R_A = abs(rmin)
+        ############################################################
+        # Loop over active partitions for the current line segment #
+        # The lines are checked in order of the lower bound of the #
+        # radius they can produce (half of the minimum distance    #
+        # from the point to the line from the bounding circle)     #
+        ############################################################
+        X_Bs = self.X_B
+        Y_Bs = self.Y_B
+        R_Bs = self.R_B
+        for line_B in self.get_cell_lines(xIndex,yIndex):
+            X_B = X_Bs[line_B]
+            Y_B = Y_Bs[line_B]
+            R_B = R_Bs[line_B]
+            GAP = sqrt( (X_B-xpt)*(X_B-xpt) + (Y_B-ypt)*(Y_B-ypt)  )
+            if GAP < abs(R_A + R_B):
+                coords_check.append( ((GAP-(R_B-self.rmax))/2.0, line_B) )
+        coords_check.sort()
+        return self.find_max_circle_lines(xpt,ypt,rmin,char_num,seg_sin,seg_cos,corner,CHK_STRING,coords_check)
+
+    ############################################################################
+    # Find the maximum radius at xpt,ypt for the lines in coords_check.  The   #
+    # items in coords_check are (lower bound of the radius, line number) and   #
+    # they must be sorted by the lower bound.                                  #
+    ############################################################################
+    def find_max_circle_lines(self,xpt,ypt,rmin,char_num,seg_sin,seg_cos,corner,CHK_STRING,coords_check):
+        global Zero
+        rtmp = rmin
+        x1 = self.x1
+        y1 = self.y1
+        x2 = self.x2
+        y2 = self.y2
+        for r_bound,linec in coords_check:
+            if r_bound > rmin + Zero:
+                break
+            xl1 = x1[linec]
+            yl1 = y1[linec]
+            xl2 = x2[linec]
+            yl2 = y2[linec]
+            xmaxt=max(xl1,xl2) + rmin*2
+            xmint=min(xl1,xl2) - rmin*2
+            ymaxt=max(yl1,yl2) + rmin*2
+            ymint=min(yl1,yl2) - rmin*2
+            if (xpt >= xmint and  ypt >= ymint and xpt <= xmaxt and  ypt <= ymaxt):
+                logic_full = True
+            else:
+                logic_full = False
+                continue
+
+            if (CHK_STRING == "chr"):
+                logic_full = logic_full and (char_num == self.cn[linec])
+
+            if corner==1:
+                logic_full = logic_full and                                                 \
+                             ( (fabs(xpt-xl1) > Zero) or (fabs(ypt-yl1) > Zero) ) and \
+                             ( (fabs(xpt-xl2) > Zero) or (fabs(ypt-yl2) > Zero) )
+
+            if logic_full:
+                xc1 = (xl1-xpt) * seg_cos - (yl1-ypt) * seg_sin
+                yc1 = (xl1-xpt) * seg_sin + (yl1-ypt) * seg_cos
+                xc2 = (xl2-xpt) * seg_cos - (yl2-ypt) * seg_sin
+                yc2 = (xl2-xpt) * seg_sin + (yl2-ypt) * seg_cos
+
+                if fabs(xc2-xc1) < Zero and fabs(yc2-yc1) > Zero:
+                    rtmp=fabs(xc1)
+                    if max(yc1,yc2) >= rtmp and min(yc1,yc2) <= rtmp:
+                        rmin = min(rmin,rtmp)
+
+                elif fabs(yc2-yc1) < Zero and fabs(xc2-xc1) > Zero:
+                    if max(xc1,xc2) >= 0.0 and min(xc1,xc2) <= 0.0 and yc1 > Zero:
+                        rtmp=yc1/2.0
+                        rmin = min(rmin,rtmp)
+
+                if fabs(yc2-yc1) > Zero and fabs(xc2-xc1) > Zero:
+                    m = (yc2-yc1)/(xc2-xc1)
+                    b = yc1 - m*xc1
+                    sq = m+1/m
+                    A = 1 + m*m - 2*m*sq
+                    B = -2*b*sq
+                    C = -b*b
+                    try:
+                        sq_root = sqrt(B*B-4*A*C)
+                        xq1 = (-B + sq_root)/(2*A)
+
+                        if xq1 >= min(xc1,xc2) and xq1 <= max(xc1,xc2):
+                            rtmp = xq1*sq + b
+                            if rtmp >= 0.0:
+                                rmin=min(rmin,rtmp)
+
+                        xq2 = (-B - sq_root)/(2*A)
+                        yq2 = m*xq2+b
+
+                        if xq2 >= min(xc1,xc2) and xq2 <= max(xc1,xc2):
+                            rtmp = xq2*sq + b
+                            if rtmp >= 0.0:
+                                rmin=min(rmin,rtmp)
+                    except:
+                        pass
+
+                if yc1 > Zero:
+                    rtmp = (xc1*xc1 + yc1*yc1) / (2*yc1)
+                    rmin=min(rmin,rtmp)
+
+                if yc2 > Zero:
+                    rtmp = (xc2*xc2 + yc2*yc2) / (2*yc2)
+                    rmin=min(rmin,rtmp)
+
+                ###### NEW V1.20 #######
+                if abs(yc1) < Zero and abs(xc1) < Zero:
+                    if yc2 > Zero:
+                        rmin = 0.0
+                if abs(yc2) < Zero and abs(xc2) < Zero:
+                    if yc1 > Zero:
+                        rmin = 0.0
+                ### END NEW V1.20 #####
+
+        return rmin
+
+    ############################################################################
+    # Batch version of find_max_circle.  The radius is found for all of the    #
+    # points in xpts,ypts (with matching seg_sin,seg_cos values) at once using #
+    # NumPy arrays.  The candidate lines are gathered once for each partition. #
+    # As in find_max_circle_lines the lines whose lower bound is above the     #
+    # radius are skipped: the radius is first found for the lines with the    #
+    # smallest bounds and only the lines that can still reduce it are kept.   #
+    # If NumPy is not available the scalar routine is called for each point.  #
+    ############################################################################
+    def find_max_circle_batch(self,xpts,ypts,rmin,char_num,seg_sins,seg_coss,corner,CHK_STRING,first_lines=32):
+        global Zero
+        npts = len(xpts)
+        if not NUMPY:
+            return [self.find_max_circle(xpts[i],ypts[i],rmin,char_num,seg_sins[i],seg_coss[i],corner,CHK_STRING) \
+                    for i in range(npts)]
+
+        cells = {}
+        for i in range(npts):
+            xIndex = int((xpts[i]-self.MINX)/self.xPartitionLength)
+            yIndex = int((ypts[i]-self.MINY)/self.yPartitionLength)
+            cells.setdefault((xIndex,yIndex),[]).append(i)
+
+        rout = [rmin]*npts
+        R_A = abs(rmin)
+        for cell in cells:
+            ind = cells[cell]
+            PA = self.get_partition_arrays(cell[0],cell[1])
+            if PA == None:
+                continue
+            x1,y1,x2,y2,cn,X_B,Y_B,R_B,xmin,xmax,ymin,ymax = PA
+
+            xp = numpy.array([xpts[i]     for i in ind])[:,None]
+            yp = numpy.array([ypts[i]     for i in ind])[:,None]
+            ss = numpy.array([seg_sins[i] for i in ind])[:,None]
+            sc = numpy.array([seg_coss[i] for i in ind])[:,None]
+
+            dX = X_B-xp
+            dY = Y_B-yp
+            GAP = numpy.sqrt( dX*dX + dY*dY )
+            act = (GAP < abs(R_A + R_B)) &                           \
+                  (xp >= xmin - rmin*2) & (yp >= ymin - rmin*2) & \
+                  (xp <= xmax + rmin*2) & (yp <= ymax + rmin*2)
+            if (CHK_STRING == "chr"):
+                act = act & (cn == char_num)
+            if corner==1:
+                act = act &                                                        \
+                      ( (numpy.abs(xp-x1) > Zero) | (numpy.abs(yp-y1) > Zero) ) & \
+                      ( (numpy.abs(xp-x2) > Zero) | (numpy.abs(yp-y2) > Zero) )
+
+            #########################################################
+            # Lower bound of the radius each line can produce (see  #
+            # find_max_circle).  The radius from the lines with the #
+            # smallest bounds is an upper bound of the final radius #
+            # (each line is taken if it passes the bounding box     #
+            # check with its own radius) so the lines with a bound  #
+            # above it are dropped before the full calculation.     #
+            #########################################################
+            r_low = numpy.where(act, (GAP-(R_B-self.rmax))/2.0, numpy.inf)
+            cols = numpy.nonzero(act.any(axis=0))[0]
+            if len(cols) == 0:
+                continue
+            if len(cols) > first_lines:
+                cols = cols[numpy.argsort(r_low[:,cols].min(axis=0),kind='mergesort')]
+                head = cols[:first_lines]
+                r = self.max_circle_radii(PA,head,xp,yp,ss,sc)
+                rb = r*2
+                ok = (xp >= xmin[head] - rb) & (yp >= ymin[head] - rb) & \
+                     (xp <= xmax[head] + rb) & (yp <= ymax[head] + rb) & act[:,head]
+                rcur = numpy.minimum(numpy.where(ok, r, numpy.inf).min(axis=1), rmin)
+                act = act & (r_low <= rcur[:,None] + Zero)
+                cols = numpy.nonzero(act.any(axis=0))[0]
+
+            act = act[:,cols]
+            r_low = r_low[:,cols]
+            xmin = xmin[cols]
+            xmax = xmax[cols]
+            ymin = ymin[cols]
+            ymax = ymax[cols]
+            r = self.max_circle_radii(PA,cols,xp,yp,ss,sc)
+            r = numpy.where(act, r, numpy.inf)
+            rnew = numpy.minimum(r.min(axis=1), rmin)
+
+            #########################################################
+            # The scalar routine shrinks the bounding box check as  #
+            # rmin gets smaller.  Make sure the line that set the   #
+            # final radius still passes the check with the final    #
+            # radius, otherwise step through the lines in order of  #
+            # their lower bounds as find_max_circle_lines does.     #
+            #########################################################
+            rb = rnew[:,None]*2
+            final = act & (xp >= xmin - rb) & (yp >= ymin - rb) & (xp <= xmax + rb) & (yp <= ymax + rb)
+            rchk = numpy.minimum(numpy.where(final, r, numpy.inf).min(axis=1), rmin)
+
+            rnew = rnew.tolist()
+            rchk = rchk.tolist()
+            for k in range(len(ind)):
+                if rchk[k] != rnew[k]:
+                    rnew[k] = rmin
+                    for j in numpy.argsort(r_low[k],kind='mergesort').tolist():
+                        if not act[k,j] or r_low[k,j] > rnew[k] + Zero:
+                            break
+                        rb = rnew[k]*2
+                        if xpts[ind[k]] >= xmin[j]-rb and ypts[ind[k]] >= ymin[j]-rb and \
+                           xpts[ind[k]] <= xmax[j]+rb and ypts[ind[k]] <= ymax[j]+rb:
+                            rnew[k] = min(rnew[k],float(r[k,j]))
+                rout[ind[k]] = rnew[k]
+        return rout
+
+    ############################################################################
+    # Radius of the circle through each point (rows of xp,yp) that touches    #
+    # each of the lines cols of the partition arrays PA (see                  #
+    # find_max_circle_lines).  Lines that give no radius are set to inf.      #
+    ############################################################################
+    def max_circle_radii(self,PA,cols,xp,yp,ss,sc):
+        global Zero
+        x1 = PA[0][cols]
+        y1 = PA[1][cols]
+        x2 = PA[2][cols]
+        y2 = PA[3][cols]
+
+        xc1 = (x1-xp) * sc - (y1-yp) * ss
+        yc1 = (x1-xp) * ss + (y1-yp) * sc
+        xc2 = (x2-xp) * sc - (y2-yp) * ss
+        yc2 = (x2-xp) * ss + (y2-yp) * sc
+        with numpy.errstate(all='ignore'):
+            r = numpy.full(xc1.shape, numpy.inf)
+            dxc = numpy.abs(xc2-xc1)
+            dyc = numpy.abs(yc2-yc1)
+            xcmin = numpy.minimum(xc1,xc2)
+            xcmax = numpy.maximum(xc1,xc2)
+
+            rtmp = numpy.abs(xc1)
+            logic = (dxc < Zero) & (dyc > Zero) & \
+                    (numpy.maximum(yc1,yc2) >= rtmp) & (numpy.minimum(yc1,yc2) <= rtmp)
+            r = numpy.where(logic, numpy.minimum(r,rtmp), r)
+
+            logic = (dyc < Zero) & (dxc > Zero) & (xcmax >= 0.0) & (xcmin <= 0.0) & (yc1 > Zero)
+            r = numpy.where(logic, numpy.minimum(r,yc1/2.0), r)
+
+            gen = (dyc > Zero) & (dxc > Zero)
+            m = (yc2-yc1)/(xc2-xc1)
+            b = yc1 - m*xc1
+            sq = m+1/m
+            A = 1 + m*m - 2*m*sq
+            B = -2*b*sq
+            C = -b*b
+            disc = B*B-4*A*C
+            gen = gen & (disc >= 0.0) & (A != 0.0)
+            sq_root = numpy.sqrt(disc)
+            xq1 = (-B + sq_root)/(2*A)
+            rtmp = xq1*sq + b
+            logic = gen & (xq1 >= xcmin) & (xq1 <= xcmax) & (rtmp >= 0.0)
+            r = numpy.where(logic, numpy.minimum(r,rtmp), r)
+            xq2 = (-B - sq_root)/(2*A)
+            rtmp = xq2*sq + b
+            logic = gen & (xq2 >= xcmin) & (xq2 <= xcmax) & (rtmp >= 0.0)
+            r = numpy.where(logic, numpy.minimum(r,rtmp), r)
+
+            rtmp = (xc1*xc1 + yc1*yc1) / (2*yc1)
+            r = numpy.where(yc1 > Zero, numpy.minimum(r,rtmp), r)
+            rtmp = (xc2*xc2 + yc2*yc2) / (2*yc2)
+            r = numpy.where(yc2 > Zero, numpy.minimum(r,rtmp), r)
+
+            ###### NEW V1.20 #######
+            logic = ( (numpy.abs(yc1) < Zero) & (numpy.abs(xc1) < Zero) & (yc2 > Zero) ) | \
+                    ( (numpy.abs(yc2) < Zero) & (numpy.abs(xc2) < Zero) & (yc1 > Zero) )
+            r = numpy.where(logic, 0.0, r)
+            ### END NEW V1.20 #####
+        return r
+
+    def get_partition_arrays(self,xIndex,yIndex):
+        try:
+            return self.partition_arrays[xIndex,yIndex]
+        except KeyError:
+            pass
+        if self.numpy_lines == None:
+            self.numpy_lines = [ numpy.frombuffer(data,dtype=numpy.float64) for data in \
+                                 (self.x1,self.y1,self.x2,self.y2,self.X_B,self.Y_B,self.R_B) ] + \
+                               [ numpy.array(self.cn) ]
+        lines = numpy.array(self.get_cell_lines(xIndex,yIndex),dtype=numpy.intp)
+        if len(lines) == 0:
+            PA = None
+        else:
+            x1,y1,x2,y2,X_B,Y_B,R_B,cn = [data[lines] for data in self.numpy_lines]
+            PA = ( x1, y1, x2, y2, cn, X_B, Y_B, R_B,
+                   numpy.minimum(x1,x2), numpy.maximum(x1,x2),
+                   numpy.minimum(y1,y2), numpy.maximum(y1,y2) )
+        self.partition_arrays[xIndex,yIndex] = PA
+        return PA
+
+
+################################################################################
+#  V-Carve calculation for one closed loop of line segments.  seg_list holds  #
+#  the index of each segment in coords (in the order they are traversed).     #
+#  These routines are at the module level so they can be run by the worker   #
+#  processes of the parallel v-carve calculation.                             #
+################################################################################
+def v_carve_point(x1,y1,phi,rout,loop_cnt):
+    Lx, Ly = Transform(0,rout,-phi)
+    xnormv = x1+Lx
+    ynormv = y1+Ly
+    return [xnormv, ynormv, rout, loop_cnt]
+
+################################################################################
+#  Adaptive version of the steps along one segment.  Every 8th step (and the  #
+#  last step) is calculated first then the midpoint of each interval is      #
+#  calculated.  An interval is split again if the radius at the midpoint is   #
+#  more than v_tol/2 from the straight line between the ends of the interval #
+#  or if the interval is longer than the radius at either end (so the cut    #
+#  circles still overlap for the clean up calculation).  The radius of the   #
+#  steps that are not needed is returned as None.  The steps in keep are     #
+#  always calculated.  This is a heuristic: only the midpoints are checked   #
+#  so a radius that changes quickly between the checked steps can be missed #
+#  and v_tol is not a guaranteed error bound.                                #
+################################################################################
+def v_carve_adaptive(grid,xpts,ypts,rmax,char_num,seg_sin,seg_cos,CHK_STRING,v_tol,dstep,keep=None):
+    npts = len(xpts)
+    routs = [None]*npts
+    if npts == 0:
+        return routs
+    if keep == None:
+        keep = []
+    find = set(range(0,npts,8))
+    find.add(npts-1)
+    for i in keep:
+        if i >= 0 and i < npts:
+            find.add(i)
+    find = sorted(find)
+    intervals = [(find[k],find[k+1]) for k in range(len(find)-1) if find[k+1]-find[k] > 1]
+    while find != []:
+        nfind = len(find)
+        rfind = grid.find_max_circle_batch([xpts[i] for i in find],[ypts[i] for i in find],rmax,char_num,
+                                           [seg_sin]*nfind,[seg_cos]*nfind,0,CHK_STRING)
+        for k in range(nfind):
+            routs[find[k]] = rfind[k]
+
+        split = []
+        for a,b in intervals:
+            m = (a+b)//2
+            if routs[m] == None:
+                continue
+            r_lin = routs[a] + (routs[b]-routs[a])*(m-a)/float(b-a)
+            if abs(routs[m]-r_lin) > v_tol/2.0 or (b-a)*dstep > min(routs[a],routs[b]):
+                split.append((a,m))
+                split.append((m,b))
+        intervals = [(a,b) for a,b in intervals if routs[(a+b)//2] == None]
+        intervals.extend([(a,b) for a,b in split if b-a > 1])
+        find = sorted(set([(a+b)//2 for a,b in intervals]))
+    return routs
+
+def v_carve_loop(grid,coords,seg_list,loop_cnt,v_set,seg_steps=None,callback=None):
+    global Zero
+    rmax,dline,dangle,v_drv_crner,v_stp_crner,BIT_ANGLE,not_b_carve,CHK_STRING,i_x1,i_y1,i_x2,i_y2,v_tol = v_set
+    vcoords = []
+    New_Loop = 1
+    for v_index in seg_list:
+        start = len(vcoords)
+        x1 = coords[v_index][i_x1]
+        y1 = coords[v_index][i_y1]
+        x2 = coords[v_index][i_x2]
+        y2 = coords[v_index][i_y2]
+        char_num = int(coords[v_index][5])
+        dx = x2-x1
+        dy = y2-y1
+        Lseg = sqrt(dx*dx + dy*dy)
+
+        #calculate the sin and cos of the coord transformation needed for
+        #the distance calculations
+        seg_sin =  dy/Lseg
+        seg_cos = -dx/Lseg
+        phi = Get_Angle(seg_sin,seg_cos)
+
+        if New_Loop==1:
+            xa = float(x1)
+            ya = float(y1)
+            xb = float(x2)
+            yb = float(y2)
+            theta = 9999.0
+            seg_sin0 = 2
+            seg_cos0 = 2
+
+        if seg_cos0 > 1.0:
+            delta = 180
+        else:
+            xtmp1 = (x2-x1) * seg_cos0 - (y2-y1) * seg_sin0
+            ytmp1 = (x2-x1) * seg_sin0 + (y2-y1) * seg_cos0
+            Ltmp=sqrt( xtmp1*xtmp1 + ytmp1*ytmp1 )
+            d_seg_sin =   ytmp1/Ltmp
+            d_seg_cos =   xtmp1/Ltmp
+            delta = Get_Angle(d_seg_sin,d_seg_cos)
+        if delta < float(v_drv_crner) and BIT_ANGLE !=0 and not_b_carve:
+            #drive to corner
+            vcoords.append([x1, y1, 0.0, loop_cnt])
+
+        if delta > float(v_stp_crner):
+           #add sub-steps around corner
+           ###########################
+           phisteps = max(floor((delta-180)/dangle),2)
+           step_phi = (delta-180)/phisteps
+           sub_phis = [radians( -pcnt*step_phi + theta ) for pcnt in range(1,int(phisteps))]
+           nsub = len(sub_phis)
+           routs = grid.find_max_circle_batch([x1]*nsub,[y1]*nsub,rmax,char_num,
+                                              [sin(sub_phi) for sub_phi in sub_phis],
+                                              [cos(sub_phi) for sub_phi in sub_phis],1,CHK_STRING)
+           for pcnt in range(nsub):
+               vcoords.append(v_carve_point(x1,y1,sub_phis[pcnt],routs[pcnt],loop_cnt))
+           #############################
+        theta = phi
+        seg_sin0=seg_sin
+        seg_cos0=seg_cos
+
+        #Calculate the number of steps then the dx and dy for each step
+        #Don't calculate at the joints.
+        if seg_steps != None:
+            nsteps = seg_steps[v_index]
+        else:
+            nsteps = max(floor(Lseg/dline),2)
+        dxpt = dx/nsteps
+        dypt = dy/nsteps
+
+        ### This makes sure the first cut start at the begining of the first segment
+        cnt_start = 1
+        if New_Loop == 1 and BIT_ANGLE !=0 and not_b_carve:
+            cnt_start = 0
+
+        phi2 = radians(Get_Angle(seg_sin,seg_cos))
+
+        #determine location of each step along outline (xpt, ypt)
+        cnts = range(cnt_start,int(nsteps))
+        xpts = [x1 + dxpt * cnt for cnt in cnts]
+        ypts = [y1 + dypt * cnt for cnt in cnts]
+        # Make the first cut drive down at an angle instead of straight down plunge
+        first = 0
+        if cnt_start==0 and not_b_carve:
+            first = 1
+        nfind = len(xpts)-first
+        if v_tol > 0.0:
+            keep = []
+            if New_Loop == 1:
+                keep.append(1-cnt_start-first)
+            routs = [0.0]*first + v_carve_adaptive(grid,xpts[first:],ypts[first:],rmax,char_num,
+                                                   seg_sin,seg_cos,CHK_STRING,v_tol,Lseg/nsteps,keep)
+        else:
+            routs = [0.0]*first + grid.find_max_circle_batch(xpts[first:],ypts[first:],rmax,char_num,
+                                                              [seg_sin]*nfind,[seg_cos]*nfind,0,CHK_STRING)
+        for i in range(len(xpts)):
+            if routs[i] == None:
+                continue
+            vcoords.append(v_carve_point(xpts[i],ypts[i],phi2,routs[i],loop_cnt))
+            if (New_Loop==1 and cnts[i]==1):
+                xpta  = xpts[i]
+                ypta  = ypts[i]
+                phi2a = phi2
+                routa = routs[i]
+
+        #################################################
+        # Check to see if we need to close an open loop #
+        #################################################
+        if (abs(x2-xa) < Zero and abs(y2-ya) < Zero):
+            xtmp1 = (xb-xa) * seg_cos0 - (yb-ya) * seg_sin0
+            ytmp1 = (xb-xa) * seg_sin0 + (yb-ya) * seg_cos0
+            Ltmp=sqrt( xtmp1*xtmp1 + ytmp1*ytmp1 )
+            d_seg_sin =   ytmp1/Ltmp
+            d_seg_cos =   xtmp1/Ltmp
+            delta = Get_Angle(d_seg_sin,d_seg_cos)
+            if delta < v_drv_crner:
+                #drive to corner
+                vcoords.append([xa, ya, 0.0, loop_cnt])
+
+            elif delta > v_stp_crner:
+                #add substeps around corner
+                phisteps = max(floor((delta-180)/dangle),2)
+                step_phi = (delta-180)/phisteps
+                sub_phis = [radians( -pcnt*step_phi + theta ) for pcnt in range(1,int(phisteps))]
+                nsub = len(sub_phis)
+                routs = grid.find_max_circle_batch([xa]*nsub,[ya]*nsub,rmax,char_num,
+                                                   [sin(sub_phi) for sub_phi in sub_phis],
+                                                   [cos(sub_phi) for sub_phi in sub_phis],1,CHK_STRING)
+                for pcnt in range(nsub):
+                    vcoords.append(v_carve_point(xa,ya,sub_phis[pcnt],routs[pcnt],loop_cnt))
+
+                vcoords.append(v_carve_point(xpta,ypta,phi2a,routa,loop_cnt))
+            else:
+                # Add closing segment
+                vcoords.append(v_carve_point(xpta,ypta,phi2a,routa,loop_cnt))
+        New_Loop = 0
+        if callback != None:
+            callback(Lseg,vcoords,start)
+    return vcoords
+
+#######################################################
+# Move v-carve results to/from the position of a      #
+# character used for the v-carve cache (relative to   #
+# x0,y0 and rotated by -theta)                        #
+#######################################################
+def v_carve_cache_xy(x,y,x0,y0,cos_t,sin_t):
+    dx = x-x0
+    dy = y-y0
+    return dx*cos_t + dy*sin_t, dy*cos_t - dx*sin_t
+
+def v_carve_cache_put(vcoords,x0,y0,cos_t,sin_t):
+    cached = []
+    for xv,yv,rv,loop_cnt in vcoords:
+        xr,yr = v_carve_cache_xy(xv,yv,x0,y0,cos_t,sin_t)
+        cached.append([xr,yr,rv])
+    return cached
+
+def v_carve_cache_get(cached,loop_cnt,x0,y0,cos_t,sin_t):
+    return [[x0 + xr*cos_t - yr*sin_t, y0 + xr*sin_t + yr*cos_t, rv, loop_cnt] for xr,yr,rv in cached]
+
+#######################################################
+# Worker process routines for the parallel v-carve    #
+# (a worker quits its chunk after the current segment #
+# when the stop event is set)                         #
+#######################################################
+V_CARVE_POOL_DATA = None
+
+def v_carve_pool_init(grid,coords,v_set,seg_steps,stop):
+    global V_CARVE_POOL_DATA
+    V_CARVE_POOL_DATA = (grid,coords,v_set,seg_steps,stop)
+
+def v_carve_pool_check(Lseg,vcoords,start):
+    if V_CARVE_POOL_DATA[4].is_set():
+        raise Exception("V-Carve calculation stopped")
+
+#######################################################
+# Stop a v-carve process pool without waiting.  The   #
+# chunks that have not started are cancelled and the  #
+# stop event ends the chunks that are running so the  #
+# worker processes do not keep using the CPUs.        #
+#######################################################
+def v_carve_pool_stop(pool,futures,stop):
+    for future in futures:
+        future.cancel()
+    stop.set()
+    pool.shutdown(wait=False)
+
+def v_carve_pool_loops(loop_list):
+    grid,coords,v_set,seg_steps,stop = V_CARVE_POOL_DATA
+    vcoords = []
+    for loop_cnt,seg_list in loop_list:
+        vcoords.extend( v_carve_loop(grid,coords,seg_list,loop_cnt,v_set,seg_steps,v_carve_pool_check) )
+    return vcoords
+
+
+#######################################################
+# Split the clean up loops into islands (an outside   #
+# loop and the holes in it) so the loop cuts for each #
+# island can be found separately                      #
+#######################################################
+def clean_loop_islands(clean_loops):
+    pc = pyclipper.Pyclipper()
+    for path in clean_loops:
+        try:
+            pc.AddPath(path, pyclipper.PT_SUBJECT, True)
+        except:
+            pass
+    try:
+        tree = pc.Execute2(pyclipper.CT_UNION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
+    except:
+        return []
+    islands = []
+    nodes = list(tree.Childs)
+    while nodes != []:
+        node = nodes.pop(0)
+        islands.append( [node.Contour] + [hole.Contour for hole in node.Childs] )
+        for hole in node.Childs:
+            nodes.extend(hole.Childs)
+    return islands
+
+#######################################################
+# Concentric loop cuts for one island.  Each ring is  #
+# offset by DL from the previous ring (instead of     #
+# from the island) until nothing is left.  The extra  #
+# points added by the round joins are cleaned out of  #
+# each ring so they do not build up from one ring to  #
+# the next.  Returns the list of rings.               #
+#######################################################
+def clean_loop_rings(island,DL):
+    rings = []
+    paths = island
+    while True:
+        pco = pyclipper.PyclipperOffset()
+        for path in paths:
+            pco.AddPath(path, pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
+        paths = pco.Execute(-DL*10000.0)
+        paths = [path for path in pyclipper.CleanPolygons(paths) if len(path) > 2]
+        if len(paths) == 0:
+            break
+        rings.append(paths)
+    return rings
+
+
+################################################################################
+#  Directory for cached data in the users home directory (it is created if it #
+#  does not exist).  Returns None if the directory can not be created.        #
+################################################################################
+def fengrave_cache_dir(name):
+    path = os.path.join(os.path.expanduser("~"),".fengrave_cache",name)
+    try:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    except:
+        return None
+    return path
+
+################################################################################
+#  Disk cache for v-carve results.  Each file is named with an md5 hash of    #
+#  the line segments and the v-carve settings.  The files hold a header (ID,  #
+#  version and number of points) followed by the x,y,r values (doubles) and   #
+#  the loop numbers (32 bit integers) stored little endian.  When the total   #
+#  size of the files is more than max_size the least recently used files are  #
+#  deleted.                                                                    #
+################################################################################
+class V_Carve_Disk_Cache:
+    ID      = b'FEVC'
+    VERSION = 1
+    EXT     = ".vcarve"
+
+    def __init__(self,path,max_size):
+        self.path = path
+        self.max_size = max_size
+
+    def key(self,coords,settings):
+        data = array('d')
+        for XY in coords:
+            data.extend(XY[0:6])
+        digest = hashlib.md5( repr( (self.VERSION,settings) ).encode('utf-8') )
+        digest.update(data.tostring() if VERSION < 3 else data.tobytes())
+        return digest.hexdigest()
+
+    def read(self,key):
+        fname = os.path.join(self.path,key+self.EXT)
+        try:
+            fin = open(fname,'rb')
+            data = fin.read()
+            fin.close()
+            ID,version,npts = struct.unpack('<4sII',data[0:12])
+            if ID != self.ID or version != self.VERSION or len(data) != 12+28*npts:
+                return None
+            xyr = array('d')
+            loops = array('i')
+            if VERSION < 3:
+                xyr.fromstring(data[12:12+24*npts])
+                loops.fromstring(data[12+24*npts:])
+            else:
+                xyr.frombytes(data[12:12+24*npts])
+                loops.frombytes(data[12+24*npts:])
+            if sys.byteorder == 'big':
+                xyr.byteswap()
+                loops.byteswap()
+            # Mark the file as recently used
+            os.utime(fname,None)
+        except:
+            return None
+        return [[xyr[3*i],xyr[3*i+1],xyr[3*i+2],loops[i]] for i in range(npts)]
+
+    def write(self,key,vcoords):
+        xyr = array('d')
+        loops = array('i')
+        for xv,yv,rv,loop_cnt in vcoords:
+            xyr.extend( (xv,yv,rv) )
+            loops.append(loop_cnt)
+        self.write_file(key,struct.pack('<4sII',self.ID,self.VERSION,len(vcoords)),[xyr,loops])
+
+    # Write the header and the arrays (little endian) to the file for key
+    # (through a temporary file so a partly written file is never read)
+    def write_file(self,key,header,arrays):
+        fname = os.path.join(self.path,key+self.EXT)
+        try:
+            ftmp = "%s.%d.tmp" %(fname,os.getpid())
+            fout = open(ftmp,'wb')
+            fout.write(header)
+            for data in arrays:
+                if sys.byteorder == 'big':
+                    data.byteswap()
+                if VERSION < 3:
+                    fout.write(data.tostring())
+                else:
+                    fout.write(data.tobytes())
+            fout.close()
+            if os.path.isfile(fname):
+                os.remove(fname)
+            os.rename(ftmp,fname)
+        except:
+            fmessage("Unable to write to the disk cache: %s" %(self.path))
+            return
+        self.evict()
+
+    def evict(self):
+        files = []
+        total = 0
+        for name in os.listdir(self.path):
+            if name.endswith(self.EXT):
+                fname = os.path.join(self.path,name)
+                try:
+                    stat = os.stat(fname)
+                except:
+                    continue
+                files.append( (stat.st_mtime,stat.st_size,fname) )
+                total = total + stat.st_size
+        files.sort()
+        for mtime,size,fname in files:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(fname)
+            except:
+                pass
+            total = total - size
+
+
+################################################################################
+#  Disk cache for fonts read from CXF files (or from ttf2cxf_stream).  Each    #
+#  file is named with an md5 hash of the font file path, modification time,  #
+#  size and the settings used to read it.  Only the bounds of the characters #
+#  are kept (the strokes are read from the font file when they are used, see #
+#  Font_Source).  The files hold a header (ID, version, number of characters #
+#  and number of line sections) followed by the character keys (32 bit       #
+#  integers), the character bounds (doubles) and, for CXF files, the range   #
+#  of byte offsets of each character (32 bit integers) stored little endian. #
+################################################################################
+class Font_Disk_Cache(V_Carve_Disk_Cache):
+    ID      = b'FEFC'
+    VERSION = 4
+    EXT     = ".font"
+
+    def key(self,file_full,settings):
+        try:
+            stat = os.stat(file_full)
+        except:
+            return None
+        data = (self.VERSION,os.path.abspath(file_full),stat.st_mtime,stat.st_size,settings)
+        return hashlib.md5( repr(data).encode('utf-8') ).hexdigest()
+
+    def read(self,key,source):
+        fname = os.path.join(self.path,key+self.EXT)
+        try:
+            fin = open(fname,'rb')
+            data = fin.read()
+            fin.close()
+            ID,version,nchar,nsect = struct.unpack('<4sIII',data[0:16])
+            if ID != self.ID or version != self.VERSION or len(data) != 16+28*nchar+8*nsect:
+                return {}
+            keys = array('i')
+            bounds = array('d')
+            offsets = array('i')
+            start = 16
+            for arr,size in ((keys,4*nchar),(bounds,24*nchar),(offsets,8*nsect)):
+                if VERSION < 3:
+                    arr.fromstring(data[start:start+size])
+                else:
+                    arr.frombytes(data[start:start+size])
+                if sys.byteorder == 'big':
+                    arr.byteswap()
+                start = start + size
+            # Mark the file as recently used
+            os.utime(fname,None)
+        except:
+            return {}
+        font = {}
+        for k in range(nchar):
+            key = keys[k]
+            font[key] = Character(key,bounds=tuple(bounds[3*k:3*k+3]),source=source)
+        if nsect > 0:
+            source.sections = {}
+            for k in range(nsect):
+                source.sections[keys[k]] = (offsets[2*k],offsets[2*k+1])
+        return font
+
+    def write(self,key,font,sections=None):
+        keys = array('i')
+        bounds = array('d')
+        offsets = array('i')
+        for char_key in font:
+            keys.append(char_key)
+            bounds.extend(font[char_key].bounds)
+            if sections != None:
+                offsets.extend(sections[char_key])
+        header = struct.pack('<4sIII',self.ID,self.VERSION,len(keys),len(offsets)//2)
+        self.write_file(key,header,[keys,bounds,offsets])
+
+
+####################################
+# Gcode_Stream writes G-code lines
+# to a file as they are appended
+# (used in place of a list of lines)
+# A line that can not be written is
+# replaced by "skipped" (or left out
+# if skipped is None)
+####################################
+class Gcode_Stream:
+    def __init__(self,fout,skipped='(skipping line)'):
+        self.fout = fout
+        self.skipped = skipped
+
+    def append(self,line):
+        try:
+            self.fout.write(line+'\n')
+        except:
+            if self.skipped != None:
+                self.fout.write(self.skipped+'\n')
+
+    def flush(self):
+        self.fout.flush()
+
+
 ####################################
 # Gcode class for creating G-Code
 ####################################
@@ -8913,6 +10473,7 @@ class Gcode:
         self.cuts = []
         self.dp = 4
         self.dpfeed = 2
+        self.fmt_dp = None
         
         self.safetyheight = self.lastz = safetyheight
         self.tolerance = tolerance
@@ -8938,12 +10499,52 @@ class Gcode:
     # will examine fewer points per run.
     def flush(self):
         if not self.cuts: return
-        for move, (x, y, z), cent in douglas(self.cuts, self.tolerance, self.plane):
+        self.write_moves(douglas(self.cuts, self.tolerance, self.plane))
+        self.cuts = []
+
+    # Write the (move, point, center) items from douglas.  Runs of G1 moves are
+    # formatted here with the last position and the formats kept in local
+    # variables.  A new feed rate is written with the next G1 move that changes
+    # the position (a G1 to the current position is not written).
+    def write_moves(self, moves):
+        if self.dp != self.fmt_dp: self.set_format()
+        fmt_x, fmt_y, fmt_z = self.fmt_x, self.fmt_y, self.fmt_z
+        write = self.write
+        lastx, lasty, lastz = self.lastx, self.lasty, self.lastz
+        for move, (x, y, z), cent in moves:
             if cent:
+                self.lastx, self.lasty, self.lastz = lastx, lasty, lastz
                 self.move_common(x, y, z, I=cent[0], J=cent[1], gcode=move)
-            else:
-                self.move_common(x, y, z, gcode="G1")
-        self.cuts = []
+                lastx, lasty, lastz = self.lastx, self.lasty, self.lastz
+                continue
+            cmd = "G1"
+            if x != lastx:
+                cmd = cmd + fmt_x % (x)
+                lastx = x
+            if y != lasty:
+                cmd = cmd + fmt_y % (y)
+                lasty = y
+            if z != lastz:
+                cmd = cmd + fmt_z % (z)
+                lastz = z
+            if len(cmd) > 2:
+                if self.feed != self.lastf:
+                    cmd = cmd + self.feed
+                    self.lastf = self.feed
+                write(cmd)
+        self.lastx, self.lasty, self.lastz = lastx, lasty, lastz
+
+    # Make the format strings for the number of decimal places in self.dp
+    def set_format(self):
+        FORMAT = "%%.%df" % (self.dp)
+        self.FORMAT = FORMAT
+        self.fmt_x = " X" + FORMAT
+        self.fmt_y = " Y" + FORMAT
+        self.fmt_z = " Z" + FORMAT
+        self.fmt_i = " I" + FORMAT
+        self.fmt_j = " J" + FORMAT
+        self.fmt_r = " R" + FORMAT
+        self.fmt_dp = self.dp
 
     def end(self):
         self.flush()
@@ -8964,7 +10565,7 @@ class Gcode:
         if (self.feed != self.lastf):
             fstring = self.feed
             self.lastf = self.feed
-        FORMAT  =  "%%.%df" % (self.dp)
+        if self.dp != self.fmt_dp: self.set_format()
 
         if (gcode == "G2" or gcode == "G3"):
             XC = self.lastx+I
@@ -8972,7 +10573,7 @@ class Gcode:
             R_check_1 = sqrt( (XC-self.lastx)**2+(YC-self.lasty)**2 )
             R_check_2 = sqrt( (XC-x         )**2+(YC-y         )**2 )
             
-            Rstring = " R"+FORMAT % ((R_check_1+R_check_2)/2.0)
+            Rstring = self.fmt_r % ((R_check_1+R_check_2)/2.0)
             if  abs(R_check_1-R_check_2) > Zero:
                 fmessage("-- G-Code Curve Fitting Anomaly - Check Output --")
                 fmessage("R_start: %f R_end %f" %(R_check_1,R_check_2))
@@ -8980,18 +10581,18 @@ class Gcode:
                 
 
         if x != self.lastx:
-                xstring = " X"+FORMAT % (x)
+                xstring = self.fmt_x % (x)
                 self.lastx = x
         if y != self.lasty:
-                ystring = " Y"+FORMAT % (y)
+                ystring = self.fmt_y % (y)
                 self.lasty = y
         if z != self.lastz:
-                zstring = " Z"+FORMAT % (z)
+                zstring = self.fmt_z % (z)
                 self.lastz = z
         if I != None:
-                Istring = " I"+FORMAT % (I)
+                Istring = self.fmt_i % (I)
         if J != None:
-                Jstring = " J"+FORMAT % (J)
+                Jstring = self.fmt_j % (J)
         if xstring == ystring == zstring == fstring == "":
             return
         
@@ -9030,8 +10631,39 @@ class Gcode:
         self.flush()
         self.rapid(z=self.safetyheight)
 
+################################################################################
+# Time the G-code output for npts points of a wavy path (--benchmark option).  #
+# The formatting of G1 moves and arcs is timed on its own and then the output #
+# is timed with the Douglas-Peucker simplification.                            #
+################################################################################
+def gcode_benchmark(npts=200000):
+    pts = [[i*0.001, 0.1*sin(i*0.01), -0.01-0.005*cos(i*0.003)] for i in range(npts)]
+    lines_moves = [("G1", p, None) for p in pts]
+    arc_moves = []
+    for i in range(npts):
+        a = i*0.01
+        arc_moves.append(("G3", [cos(a+0.01), sin(a+0.01), -0.01], (-cos(a), -sin(a))))
+    tests = [("G1 formatting",      0.001, None, lines_moves),
+             ("G3 formatting",      0.001, 17,   arc_moves  ),
+             ("simplify and format",0.001, None, None       )]
+    for name, tolerance, plane, moves in tests:
+        lines = []
+        g = Gcode(safetyheight=0.1, tolerance=tolerance, target=lines.append, arc_fit="center")
+        g.set_plane(plane or 17)
+        g.set_feed(10.0)
+        g.lastx, g.lasty, g.lastz = 1.0, 0.0, -0.01
+        t0 = time()
+        if moves != None:
+            g.write_moves(moves)
+        else:
+            for x,y,z in pts:
+                g.cut(x,y,z)
+            g.flush()
+        dt = max(time()-t0,Zero)
+        fmessage("G-code %s: %d points, %d lines in %.3fs (%.0f lines/s)" %(name,npts,len(lines),dt,len(lines)/dt))
+
 # Perform Douglas-Peucker simplification on the path 'st' with the specified
-# tolerance.  The '_first' argument is for internal use only.
+# tolerance.
 #
 # The Douglas-Peucker simplification algorithm finds a subset of the input points
 # whose path is never more than 'tolerance' away from the original input path.
@@ -9044,102 +10676,157 @@ class Gcode:
 # perpendicular to the arc, it will be distorted, so 'plane' should usually
 # be specified only when there is only movement on 2 axes
 #
-def douglas(st, tolerance=.001, plane=None, _first=True):
+# The sections of the path are index ranges of 'st' kept on a stack (instead of
+# recursing on copies of the list).  The output is the same as the recursive
+# version.  Long sections use NumPy (if available) to find the worst point.
+#
+def douglas(st, tolerance=.001, plane=None):
     if len(st) == 1:
         yield "G1", st[0], None
         return
-    #if len(st) < 1:
-    #    print "whaaaa!?"
-    #    #yield "G1", st[0], None
-    #    return
-    
-    L1 = st[0]
-    L2 = st[-1]
-    
-    last_point = None
-    while (abs(L1[0]-L2[0]) < Zero) and (abs(L1[1]-L2[1]) < Zero) and (abs(L1[2]-L2[2]) < Zero):
-        last_point=st.pop()
-        try:
-            L2 = st[-1]
-        except:
-            return    
+
+    pts = None
+    if NUMPY and len(st) > 32:
+        pts = numpy.array(st,dtype=float)
+
+    # stack entries are (lo, hi, first) sections or ("G1", point) output
+    stack = [(0, len(st)-1, True)]
+    while stack:
+        task = stack.pop()
+        if task[0] == "G1":
+            yield "G1", task[1], None
+            continue
+        lo, hi, first = task
+        if hi == lo:
+            yield "G1", st[lo], None
+            continue
+
+        L1 = st[lo]
+        L2 = st[hi]
+        last_point = None
+        while (abs(L1[0]-L2[0]) < Zero) and (abs(L1[1]-L2[1]) < Zero) and (abs(L1[2]-L2[2]) < Zero):
+            last_point = L2
+            hi = hi-1
+            if hi < lo:
+                break
+            L2 = st[hi]
+        if hi < lo:
+            continue
+
+        worst, worst_dist, max_arc, min_rad = douglas_worst(st, pts, lo, hi, plane)
+        ps = st[lo]
+        pe = st[hi]
+
+        worst_arc_dist = MAXINT
+        if min_rad != MAXINT:
+            c1, c2 = arc_center(plane, ps, st[max_arc], pe)
+            if one_quadrant(plane, (c1, c2), ps, st[max_arc], pe):
+                worst_arc_dist = douglas_arc_dist(st, pts, lo, hi, plane, c1, c2, min_rad,
+                                                  min(tolerance,worst_dist))
+
+        out = []
+        if worst_arc_dist < tolerance and worst_arc_dist < worst_dist:
+            ccw = arc_dir(plane, (c1, c2), ps, st[max_arc], pe)
+            if plane == 18:
+                ccw = not ccw
+            yield "G1", ps, None
+            if ccw:
+                yield "G3", pe, arc_fmt(plane, c1, c2, ps)
+            else:
+                yield "G2", pe, arc_fmt(plane, c1, c2, ps)
+        elif worst_dist > tolerance:
+            if first: yield "G1", ps, None
+            out.append((lo, worst, False))
+            out.append(("G1", st[worst]))
+            out.append((worst, hi, False))
+            if first: out.append(("G1", pe))
+        else:
+            if first: yield "G1", ps, None
+            if first: yield "G1", pe, None
+
+        if last_point != None:            #added to fix closed loop problem
+            out.append(("G1", ps))        #added to fix closed loop problem
+        out.reverse()
+        stack.extend(out)
+
+# Find the point of st[lo:hi+1] furthest from the line st[lo]..st[hi] and
+# the point (of the points that were the worst so far) with the smallest
+# arc radius through st[lo] and st[hi].
+# Returns (worst, worst_dist, max_arc, min_rad)
+def douglas_worst(st, pts, lo, hi, plane):
+    x0, y0, z0 = st[lo]
+    xa, ya, za = st[hi]
+    dx = xa-x0
+    dy = ya-y0
+    dz = za-z0
+    d2 = dx*dx + dy*dy + dz*dz
 
     worst_dist = 0
-    worst_distz = 0 #added to fix out of plane inacuracy problem
-    worst = 0
+    worst = lo
+    records = []
+    if d2 == 0 or hi-lo < 2:
+        pass
+    elif pts is not None and hi-lo > 32:
+        P = pts[lo+1:hi]
+        t = (dx * (P[:,0]-x0) + dy * (P[:,1]-y0) + dz * (P[:,2]-z0)) / d2
+        t = numpy.clip(t,0,1)
+        dist = numpy.sqrt((P[:,0] - x0 - t*dx)**2 + (P[:,1] - y0 - t*dy)**2 + (P[:,2] - z0 - t*dz)**2)
+        # the points that are worse than all of the points before them
+        prev = numpy.maximum.accumulate(numpy.concatenate(([0.0],dist[:-1])))
+        records = (numpy.nonzero(dist > prev)[0] + (lo+1)).tolist()
+        if records != []:
+            worst = records[-1]
+            worst_dist = float(dist[worst-lo-1])
+    else:
+        for i in range(lo+1,hi):
+            xi, yi, zi = st[i]
+            t = (dx * (xi-x0) + dy * (yi-y0) + dz * (zi-z0)) / d2
+            if t < 0: t = 0
+            if t > 1: t = 1
+            dist = ((xi - x0 - t*dx)**2 + (yi - y0 - t*dy)**2 + (zi - z0 - t*dz)**2) ** .5
+            if dist > worst_dist:
+                worst = i
+                worst_dist = dist
+                records.append(i)
+
     min_rad = MAXINT
     max_arc = -1
-
-    ps = st[0]
-    pe = st[-1]
-
-    for i, p in enumerate(st):
-        if p is L1 or p is L2: continue
-        dist  = dist_lseg(L1, L2, p)
-        distz = dist_lseg(L1, L2, p, z_only=True) #added to fix out of plane inacuracy problem
-        if dist > worst_dist:
-            worst = i
-            worst_dist = dist
-            rad = arc_rad(plane, ps, p, pe)
+    if plane != None:
+        for i in records:
+            rad = arc_rad(plane, st[lo], st[i], st[hi])
             if rad < min_rad:
                 max_arc = i
                 min_rad = rad
-        if distz > worst_distz: #added to fix out of plane inacuracy problem
-            worst_distz = distz #added to fix out of plane inacuracy problem
+    return worst, worst_dist, max_arc, min_rad
 
-    worst_arc_dist = 0
-    if min_rad != MAXINT:
-        c1, c2 = arc_center(plane, ps, st[max_arc], pe)
-        Lx, Ly, Lz = st[0]
-        if one_quadrant(plane, (c1, c2), ps, st[max_arc], pe):
-            for i, (x,y,z) in enumerate(st):
-                if plane == 17:
-                    dist1 = abs(hypot(c1-x, c2-y) - min_rad)
-                    dist = sqrt(worst_distz**2 + dist1**2) #added to fix out of plane inacuracy problem
-                elif plane == 18:
-                    dist = abs(hypot(c1-x, c2-z) - min_rad)
-                elif plane == 19:
-                    dist = abs(hypot(c1-y, c2-z) - min_rad)
-                else: dist = MAXINT
-                
-                if dist > worst_arc_dist: worst_arc_dist = dist
-
-                mx = (x+Lx)/2
-                my = (y+Ly)/2
-                mz = (z+Lz)/2
-                if plane == 17: dist = abs(hypot(c1-mx, c2-my) - min_rad)
-                elif plane == 18: dist = abs(hypot(c1-mx, c2-mz) - min_rad)
-                elif plane == 19: dist = abs(hypot(c1-my, c2-mz) - min_rad)
-                else: dist = MAXINT
-                Lx, Ly, Lz = x, y, z
-        else:
-            worst_arc_dist = MAXINT
-    else:
-        worst_arc_dist = MAXINT
-
-    if worst_arc_dist < tolerance and worst_arc_dist < worst_dist:
-        ccw = arc_dir(plane, (c1, c2), ps, st[max_arc], pe)
-        if plane == 18:
-            ccw = not ccw
-        yield "G1", ps, None
-        if ccw:
-            yield "G3", st[-1], arc_fmt(plane, c1, c2, ps)
-        else:
-            yield "G2", st[-1], arc_fmt(plane, c1, c2, ps)
-    elif worst_dist > tolerance:
-        if _first: yield "G1", st[0], None
-        for i in douglas(st[:worst+1], tolerance, plane, False):
-            yield i
-        yield "G1", st[worst], None
-        for i in douglas(st[worst:], tolerance, plane, False):
-            yield i
-        if _first: yield "G1", st[-1], None
-    else:
-        if _first: yield "G1", st[0], None
-        if _first: yield "G1", st[-1], None
+# Largest distance of the points in st[lo:hi+1] from the arc with center c1,c2
+# and radius rad.  Stops once the distance is more than 'limit'.
+def douglas_arc_dist(st, pts, lo, hi, plane, c1, c2, rad, limit):
+    worst_distz = 0
+    if plane == 17:
+        #added to fix out of plane inacuracy problem
+        for i in range(lo+1,hi):
+            distz = dist_lseg(st[lo], st[hi], st[i], z_only=True)
+            if distz > worst_distz:
+                worst_distz = distz
 
-    if last_point != None:      #added to fix closed loop problem
-        yield "G1", st[0], None #added to fix closed loop problem
+    worst_arc_dist = 0
+    for i in range(lo,hi+1):
+        x, y, z = st[i]
+        if plane == 17:
+            dist1 = abs(hypot(c1-x, c2-y) - rad)
+            dist = sqrt(worst_distz**2 + dist1**2) #added to fix out of plane inacuracy problem
+        elif plane == 18:
+            dist = abs(hypot(c1-x, c2-z) - rad)
+        elif plane == 19:
+            dist = abs(hypot(c1-y, c2-z) - rad)
+        else: dist = MAXINT
+
+        if dist > worst_arc_dist:
+            worst_arc_dist = dist
+            if worst_arc_dist >= limit:
+                break
+    return worst_arc_dist
 
 
 ################################################################################
@@ -9339,60 +11026,63 @@ def arc_fmt(plane, c1, c2, p1):
 ################################################################################
 #                          Start-up Application                                #
 ################################################################################
-root = Tk()
-#root.tk.call('tk', 'scaling', '1.25')
-app = Application(root)
-app.master.title("F-Engrave V"+version)
-app.master.iconname("F-Engrave")
-app.master.minsize(780,540)
+if __name__ == "__main__":
+    if PARALLEL:
+        multiprocessing.freeze_support()
+    root = Tk()
+    #root.tk.call('tk', 'scaling', '1.25')
+    app = Application(root)
+    app.master.title("F-Engrave V"+version)
+    app.master.iconname("F-Engrave")
+    app.master.minsize(780,540)
 
-try:
     try:
-        import tkFont
-        default_font = tkFont.nametofont(get_default_font_name())
-    except:
-        import tkinter.font
-        default_font = tkinter.font.nametofont(get_default_font_name())
+        try:
+            import tkFont
+            default_font = tkFont.nametofont(get_default_font_name())
+        except:
+            import tkinter.font
+            default_font = tkinter.font.nametofont(get_default_font_name())
 
-    default_font.configure(size=9)
-    default_font.configure(family='arial')
-    #print(default_font.cget("size"))
-    #print(default_font.cget("family"))
-except:
-    debug_message("Font Set Failed.")
+        default_font.configure(size=9)
+        default_font.configure(family='arial')
+        #print(default_font.cget("size"))
+        #print(default_font.cget("family"))
+    except:
+        debug_message("Font Set Failed.")
     
-################################## Set Icon  ########################################
-Icon_Set=False
-
-try:
-    sroot.iconbitmap(default="emblem")
-    Icon_Set=True
-except:
+    ################################## Set Icon  ########################################
     Icon_Set=False
-        
-if not Icon_Set:
+
     try:
-        scorch_ico_B64=b'R0lGODlhEAAQAIYAAA\
-        AAABAQEBYWFhcXFxsbGyUlJSYmJikpKSwsLC4uLi8vLzExMTMzMzc3Nzg4ODk5OTs7Oz4+PkJCQkRERE\
-        VFRUtLS0xMTE5OTlNTU1dXV1xcXGBgYGVlZWhoaGtra3FxcXR0dHh4eICAgISEhI+Pj5mZmZ2dnaKioq\
-        Ojo62tra6urrS0tLi4uLm5ub29vcLCwsbGxsjIyMzMzM/Pz9PT09XV1dbW1tjY2Nzc3OHh4eLi4uXl5e\
-        fn5+jo6Ovr6+/v7/Hx8fLy8vT09PX19fn5+fv7+/z8/P7+/v///wAAAAAAAAAAAAAAAAAAAAAAAAAAAA\
-        AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA\
-        AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA\
-        AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAACH5BAEKAEkALAAAAAAQABAAQAj/AJMIFBhBQYAACRIkWbgwAA\
-        4kEFEECACAxBAkGH8ESEKgBZIiAIQECBAjAA8kNwIkScKgQhAkRggAIJACCZIaJxgk2clgAY4OAAoEAO\
-        ABCIIDSZIwkIHEBw0YFAAA6IGDCBIkLAhMyICka9cAKZCIRTLEBIMkaA0MSNGjSBEVIgpESEK3LgMCI1\
-        aAWCFDA4EDSQInwaDACBEAImLwCAFARw4HFJJcgGADyZEAL3YQcMGBBpIjHx4EeIGkRoMFJgakWADABx\
-        IkPwIgcIGkdm0AMJDo1g3jQBIBRZAINyKAwxEkyHEUSMIcwYYbEgwYmQGgyI8SD5Jo327hgIIAAQ5cBs\
-        CQpHySgAA7'
-        icon_im =PhotoImage(data=scorch_ico_B64, format='gif')
-        root.call('wm', 'iconphoto', root._w, '-default', icon_im)
+        sroot.iconbitmap(default="emblem")
+        Icon_Set=True
     except:
-        pass
+        Icon_Set=False
+        
+    if not Icon_Set:
+        try:
+            scorch_ico_B64=b'R0lGODlhEAAQAIYAAA\
+            AAABAQEBYWFhcXFxsbGyUlJSYmJikpKSwsLC4uLi8vLzExMTMzMzc3Nzg4ODk5OTs7Oz4+PkJCQkRERE\
+            VFRUtLS0xMTE5OTlNTU1dXV1xcXGBgYGVlZWhoaGtra3FxcXR0dHh4eICAgISEhI+Pj5mZmZ2dnaKioq\
+            Ojo62tra6urrS0tLi4uLm5ub29vcLCwsbGxsjIyMzMzM/Pz9PT09XV1dbW1tjY2Nzc3OHh4eLi4uXl5e\
+            fn5+jo6Ovr6+/v7/Hx8fLy8vT09PX19fn5+fv7+/z8/P7+/v///wAAAAAAAAAAAAAAAAAAAAAAAAAAAA\
+            AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA\
+            AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA\
+            AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAACH5BAEKAEkALAAAAAAQABAAQAj/AJMIFBhBQYAACRIkWbgwAA\
+            4kEFEECACAxBAkGH8ESEKgBZIiAIQECBAjAA8kNwIkScKgQhAkRggAIJACCZIaJxgk2clgAY4OAAoEAO\
+            ABCIIDSZIwkIHEBw0YFAAA6IGDCBIkLAhMyICka9cAKZCIRTLEBIMkaA0MSNGjSBEVIgpESEK3LgMCI1\
+            aAWCFDA4EDSQInwaDACBEAImLwCAFARw4HFJJcgGADyZEAL3YQcMGBBpIjHx4EeIGkRoMFJgakWADABx\
+            IkPwIgcIGkdm0AMJDo1g3jQBIBRZAINyKAwxEkyHEUSMIcwYYbEgwYmQGgyI8SD5Jo327hgIIAAQ5cBs\
+            CQpHySgAA7'
+            icon_im =PhotoImage(data=scorch_ico_B64, format='gif')
+            root.call('wm', 'iconphoto', root._w, '-default', icon_im)
+        except:
+            pass
 
-#####################################################################################
+    #####################################################################################
 
-app.f_engrave_init()
-root.mainloop()
+    app.f_engrave_init()
+    root.mainloop()
 
 